@@ -0,0 +1,113 @@
+import asyncio
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpRequest
+from django.utils.functional import SimpleLazyObject
+
+from .routers import use_replica
+
+PRIMARY_PIN_COOKIE = 'primary_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def primary_pin_key(user_id: int) -> str:
+    """Cache key pinning requests of user to primary database."""
+    return f'db.primary_pin.user.{user_id}'
+
+
+def authenticated_user_id(request: HttpRequest) -> Optional[int]:
+    """Id of user authenticated by view, lazy session user is never loaded."""
+    user = request.__dict__.get('user')
+    if user is None or type(user) is SimpleLazyObject or not user.is_authenticated:
+        return None
+    return user.pk
+
+
+def is_pinned(request: HttpRequest) -> bool:
+    """Check if client wrote recently and must read from primary database."""
+    return PRIMARY_PIN_COOKIE in request.COOKIES
+
+
+def stick_to_primary(user_id: int):
+    """Send remaining reads of request to primary database when user wrote within stickiness window.
+
+    Called once request is authenticated, pin survives new tokens issued by login or refresh.
+    """
+    if settings.DATABASE_REPLICAS and use_replica.get() and cache.get(primary_pin_key(user_id)) is not None:
+        use_replica.set(False)
+
+
+async def astick_to_primary(user_id: int):
+    """Send remaining reads of request to primary database without blocking event loop."""
+    if settings.DATABASE_REPLICAS and use_replica.get() and await cache.aget(primary_pin_key(user_id)) is not None:
+        use_replica.set(False)
+
+
+class ReplicaRoutingMiddleware:
+    """Let safe requests read from replicas unless client wrote within stickiness window.
+
+    Successful writes pin client to primary database with cookie and, for
+    authenticated users, with cache marker bound to their id. Without replicas
+    requests pass through untouched.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(self.get_response):
+            # Mark instance as coroutine function so async handler awaits it directly.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request: HttpRequest):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+
+        if request.method not in SAFE_METHODS:
+            response = self.get_response(request)
+            if response.status_code < 400:
+                self.pin(request, response)
+            return response
+
+        token = use_replica.set(not is_pinned(request))
+        try:
+            return self.get_response(request)
+        finally:
+            use_replica.reset(token)
+
+    async def __acall__(self, request: HttpRequest):
+        """Async version of __call__."""
+        if not settings.DATABASE_REPLICAS:
+            return await self.get_response(request)
+
+        if request.method not in SAFE_METHODS:
+            response = await self.get_response(request)
+            if response.status_code < 400:
+                await self.apin(request, response)
+            return response
+
+        token = use_replica.set(not is_pinned(request))
+        try:
+            return await self.get_response(request)
+        finally:
+            use_replica.reset(token)
+
+    def pin(self, request: HttpRequest, response):
+        """Pin client to primary database for stickiness window."""
+        window = settings.PRIMARY_STICKINESS_SECONDS
+        response.set_cookie(PRIMARY_PIN_COOKIE, '1', max_age=window, httponly=True, samesite='Lax')
+        user_id = authenticated_user_id(request)
+        if user_id is not None:
+            cache.set(primary_pin_key(user_id), True, window)
+
+    async def apin(self, request: HttpRequest, response):
+        """Pin client to primary database without blocking event loop."""
+        window = settings.PRIMARY_STICKINESS_SECONDS
+        response.set_cookie(PRIMARY_PIN_COOKIE, '1', max_age=window, httponly=True, samesite='Lax')
+        user_id = authenticated_user_id(request)
+        if user_id is not None:
+            await cache.aset(primary_pin_key(user_id), True, window)
@@ -0,0 +1,36 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+# set for safe requests not pinned to primary database
+use_replica = ContextVar('use_replica', default=False)
+
+
+@contextmanager
+def primary_reads():
+    """Read from primary database inside block, e.g. when filling shared caches."""
+    token = use_replica.set(False)
+    try:
+        yield
+    finally:
+        use_replica.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """Send reads of replica eligible requests to replicas, everything else to primary."""
+
+    def db_for_read(self, model, **hints):
+        if settings.DATABASE_REPLICAS and use_replica.get():
+            return random.choice(settings.DATABASE_REPLICAS)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
@@ -1,4 +1,7 @@
 from pathlib import Path
+
+import dj_database_url
+from django.core.exceptions import ImproperlyConfigured
 from environs import Env 
 
 env = Env()
@@ -39,11 +42,15 @@ INSTALLED_APPS = [
     'tokens.apps.TokensConfig',
     'posts.apps.PostsConfig',
     'follows.apps.FollowsConfig',
+    'feeds.apps.FeedsConfig',
     'docs.apps.DocsConfig',
+    'metrics.apps.MetricsConfig',
+    'exports.apps.ExportsConfig',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'django_project.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -82,6 +89,46 @@ DATABASES = {
     'default': env.dj_db_url('DATABASE_URL')
 }
 
+# Read replicas serving safe requests
+DATABASE_REPLICAS = []
+for index, url in enumerate(env.list('DATABASE_REPLICA_URLS', default=[]), start=1):
+    DATABASES[f'replica{index}'] = dj_database_url.parse(url)
+    DATABASE_REPLICAS.append(f'replica{index}')
+
+DATABASE_ROUTERS = ['django_project.routers.PrimaryReplicaRouter']
+
+# Seconds client reads stick to primary database after write
+PRIMARY_STICKINESS_SECONDS = env.int('PRIMARY_STICKINESS_SECONDS', default=10)
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+
+CACHES = {
+    'default': env.dj_cache_url('CACHE_URL', default='locmem://')
+}
+
+# Number of server worker processes, read by gunicorn and uvicorn as well
+WEB_CONCURRENCY = env.int('WEB_CONCURRENCY', default=1)
+
+# payload and token caches, deny list, throttle buckets, metrics and primary pins must be seen by every worker
+if CACHES['default']['BACKEND'].endswith('LocMemCache') and (DATABASE_REPLICAS or WEB_CONCURRENCY > 1):
+    raise ImproperlyConfigured(
+        'In-process cache is not shared between workers, set CACHE_URL when running several workers or replicas.'
+    )
+
+PAYLOAD_CACHE_TIMEOUT = env.int('PAYLOAD_CACHE_TIMEOUT', default=300)
+
+# users checked more than threshold times within timeout by single worker get their followed ids cached
+FOLLOW_SET_HOT_THRESHOLD = env.int('FOLLOW_SET_HOT_THRESHOLD', default=10)
+FOLLOW_SET_TIMEOUT = env.int('FOLLOW_SET_TIMEOUT', default=300)
+FOLLOW_SET_MAX_SIZE = env.int('FOLLOW_SET_MAX_SIZE', default=100000)
+RELATIONSHIPS_MAX_IDS = env.int('RELATIONSHIPS_MAX_IDS', default=300)
+
+# best scored candidates kept per user and users processed at once by compute_suggestions
+SUGGESTIONS_PER_USER = env.int('SUGGESTIONS_PER_USER', default=50)
+SUGGESTIONS_CHUNK_SIZE = env.int('SUGGESTIONS_CHUNK_SIZE', default=100)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
@@ -135,9 +182,65 @@ REFRESH_TOKEN_EXPIRE_DAYS = env.int('REFRESH_TOKEN_EXPIRE_DAYS', default=7)
 REFRESH_TOKEN_IN_BODY = env.bool('REFRESH_TOKEN_IN_BODY')
 REFRESH_TOKEN_IN_COOKIE = env.bool('REFRESH_TOKEN_IN_COOKIE')
 
+# self-contained access tokens signed with SECRET_KEY, revoked ones are denied by every worker within sync interval,
+# deny list is rebuilt on request path, one request per interval in each worker pays for indexed range query over
+# tokens revoked during last access token lifetime
+STATELESS_ACCESS_TOKENS = env.bool('STATELESS_ACCESS_TOKENS', default=False)
+TOKEN_DENY_LIST_SYNC_INTERVAL = env.int('TOKEN_DENY_LIST_SYNC_INTERVAL', default=5)
+
+# access token verification cache, local entries outlive revocation in other processes
+TOKEN_CACHE_TIMEOUT = env.int('TOKEN_CACHE_TIMEOUT', default=60)
+TOKEN_LOCAL_CACHE_TIMEOUT = env.int('TOKEN_LOCAL_CACHE_TIMEOUT', default=5)
+TOKEN_LOCAL_CACHE_SIZE = env.int('TOKEN_LOCAL_CACHE_SIZE', default=10000)
+
+# expired tokens are deleted by reap_tokens command or by worker thread every interval seconds(0 disables it)
+TOKEN_REAP_INTERVAL = env.int('TOKEN_REAP_INTERVAL', default=0)
+TOKEN_REAP_BATCH_SIZE = env.int('TOKEN_REAP_BATCH_SIZE', default=1000)
+
+# last seen writes are buffered per worker, changes smaller than resolution are dropped
+LAST_SEEN_RESOLUTION = env.int('LAST_SEEN_RESOLUTION', default=60)
+LAST_SEEN_FLUSH_INTERVAL = env.int('LAST_SEEN_FLUSH_INTERVAL', default=10)
+
+# async views, enable when running under ASGI server
+ASYNC_VIEWS = env.bool('ASYNC_VIEWS', default=False)
+
+# pagination
+PAGINATION_MAX_LIMIT = env.int('PAGINATION_MAX_LIMIT', default=100)
+
+# posts
+POSTS_BATCH_MAX_SIZE = env.int('POSTS_BATCH_MAX_SIZE', default=500)
+
+# home timelines, fan-out only inserts, timelines longer than cap plus slack are cut by trim_timelines command
+FEED_MAX_ENTRIES = env.int('FEED_MAX_ENTRIES', default=800)
+FEED_TRIM_SLACK = env.int('FEED_TRIM_SLACK', default=200)
+FEED_FANOUT_BATCH_SIZE = env.int('FEED_FANOUT_BATCH_SIZE', default=1000)
+
+# bulk export
+EXPORT_CHUNK_SIZE = env.int('EXPORT_CHUNK_SIZE', default=2000)
+
 # django-rest-framework settings
 REST_FRAMEWORK = {
-    'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema'
+    'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_RENDERER_CLASSES': [
+        'users.renderers.ORJSONRenderer',
+        'users.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'rest_framework.parsers.JSONParser',
+        'users.parsers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    # number of trusted reverse proxies in front of app, X-Forwarded-For is ignored when unset
+    'NUM_PROXIES': env.int('NUM_PROXIES', default=None),
+    # token bucket rates as 'capacity/period', applied to unsafe requests only
+    'DEFAULT_THROTTLE_RATES': {
+        'tokens.ip': env.str('THROTTLE_TOKENS_IP_RATE', default='30/min'),
+        'tokens.username': env.str('THROTTLE_TOKENS_USERNAME_RATE', default='10/min'),
+        'posts.user': env.str('THROTTLE_POSTS_USER_RATE', default='120/min'),
+        'follows.user': env.str('THROTTLE_FOLLOWS_USER_RATE', default='120/min'),
+    }
 }
 
 # drf-spectacular settings
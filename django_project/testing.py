@@ -0,0 +1,37 @@
+from django.core.cache import cache
+from django.test import override_settings
+
+from tokens.cache import local_cache
+from tokens.models import Token
+
+
+class QueryBudgetMixin:
+    """Check read endpoints stay within query budgets, every url is requested with cold caches.
+
+    Urls may contain {pk} of budget_user, /me/ urls are requested with access token of budget_user.
+    """
+    budgets = {}
+    budget_user = None
+    page_size = None
+
+    def budget_user_credentials(self) -> dict:
+        token = Token(user=self.budget_user)
+        token.generate()
+        token.save()
+        return {'HTTP_AUTHORIZATION': f'Bearer {token.access_token}'}
+
+    # signed tokens sync deny list on first use, keep token verification cost stable
+    @override_settings(STATELESS_ACCESS_TOKENS=False)
+    def test_query_budgets(self):
+        credentials = self.budget_user_credentials() if self.budget_user is not None else {}
+
+        for url, budget in self.budgets.items():
+            if self.budget_user is not None:
+                url = url.format(pk=self.budget_user.pk)
+            cache.clear()
+            local_cache.clear()
+            with self.subTest(url=url), self.assertNumQueries(budget):
+                resp = self.client.get(url, **(credentials if '/me/' in url else {}))
+                self.assertEqual(resp.status_code, 200)
+                if self.page_size is not None:
+                    self.assertEqual(len(resp.data['data']), self.page_size)
@@ -0,0 +1,112 @@
+from asyncio import iscoroutinefunction
+from types import SimpleNamespace
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.db import router
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from posts.models import Post
+from .middleware import PRIMARY_PIN_COOKIE, ReplicaRoutingMiddleware, astick_to_primary, stick_to_primary
+
+
+@override_settings(DATABASE_REPLICAS=['replica1', 'replica2'], PRIMARY_STICKINESS_SECONDS=5)
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.status = 200
+        self.user = None
+        self.stick_to = None
+        self.middleware = ReplicaRoutingMiddleware(self.route)
+
+    def route(self, request):
+        if self.user is not None:
+            request.user = self.user
+        if self.stick_to is not None:
+            stick_to_primary(self.stick_to)
+        response = HttpResponse(status=self.status)
+        response.read_db = router.db_for_read(Post)
+        response.write_db = router.db_for_write(Post)
+        return response
+
+    async def aroute(self, request):
+        if self.user is not None:
+            request.user = self.user
+        if self.stick_to is not None:
+            await astick_to_primary(self.stick_to)
+        response = HttpResponse(status=self.status)
+        response.read_db = router.db_for_read(Post)
+        response.write_db = router.db_for_write(Post)
+        return response
+
+    def test_safe_requests_read_from_replicas(self):
+        resp = self.middleware(self.factory.get('/posts/'))
+
+        self.assertIn(resp.read_db, ['replica1', 'replica2'])
+        self.assertEqual(resp.write_db, 'default')
+        self.assertEqual(router.db_for_read(Post), 'default')
+
+    def test_write_pins_client_with_cookie(self):
+        resp = self.middleware(self.factory.put('/posts/1/'))
+        self.assertEqual(resp.read_db, 'default')
+        self.assertEqual(resp.cookies[PRIMARY_PIN_COOKIE]['max-age'], 5)
+
+        self.factory.cookies[PRIMARY_PIN_COOKIE] = '1'
+        resp = self.middleware(self.factory.get('/posts/1/'))
+        self.assertEqual(resp.read_db, 'default')
+
+    def test_write_pins_authenticated_user(self):
+        self.user = SimpleNamespace(pk=7, is_authenticated=True)
+        self.middleware(self.factory.post('/tokens/', HTTP_AUTHORIZATION='Basic Ym9iOmRvZw=='))
+
+        # reads with token issued by the write are routed once request is authenticated
+        self.user = None
+        self.stick_to = 7
+        resp = self.middleware(self.factory.get('/me/following/', HTTP_AUTHORIZATION='Bearer new'))
+        self.assertEqual(resp.read_db, 'default')
+
+        self.stick_to = 8
+        resp = self.middleware(self.factory.get('/me/following/', HTTP_AUTHORIZATION='Bearer other'))
+        self.assertIn(resp.read_db, ['replica1', 'replica2'])
+
+    def test_failed_write_does_not_pin(self):
+        self.status = 400
+        resp = self.middleware(self.factory.post('/posts/', HTTP_AUTHORIZATION='Bearer first'))
+        self.assertNotIn(PRIMARY_PIN_COOKIE, resp.cookies)
+
+        self.status = 200
+        resp = self.middleware(self.factory.get('/posts/', HTTP_AUTHORIZATION='Bearer first'))
+        self.assertIn(resp.read_db, ['replica1', 'replica2'])
+
+    def test_async_middleware_pins_authenticated_user(self):
+        middleware = ReplicaRoutingMiddleware(self.aroute)
+        self.assertTrue(iscoroutinefunction(middleware))
+
+        self.user = SimpleNamespace(pk=7, is_authenticated=True)
+        resp = async_to_sync(middleware)(self.factory.post('/posts/'))
+        self.assertEqual(resp.read_db, 'default')
+        self.assertIn(PRIMARY_PIN_COOKIE, resp.cookies)
+
+        self.user = None
+        self.stick_to = 7
+        resp = async_to_sync(middleware)(self.factory.get('/me/following/'))
+        self.assertEqual(resp.read_db, 'default')
+        self.assertEqual(router.db_for_read(Post), 'default')
+
+        self.stick_to = None
+        resp = async_to_sync(middleware)(self.factory.get('/posts/'))
+        self.assertIn(resp.read_db, ['replica1', 'replica2'])
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas_pass_through(self):
+        self.user = SimpleNamespace(pk=7, is_authenticated=True)
+        resp = self.middleware(self.factory.post('/posts/'))
+        self.assertNotIn(PRIMARY_PIN_COOKIE, resp.cookies)
+        self.assertIsNone(cache.get('db.primary_pin.user.7'))
+
+        self.user = None
+        self.stick_to = 7
+        resp = self.middleware(self.factory.get('/me/following/'))
+        self.assertEqual(resp.read_db, 'default')
@@ -10,5 +10,8 @@ urlpatterns = [
     path('posts/', include('posts.urls')),
     path('schema/', SpectacularJSONAPIView.as_view(), name='schema'),
     path('docs/', include('docs.urls')),
+    path('metrics/', include('metrics.urls')),
+    path('export/', include('exports.urls')),
     path('', include('follows.urls')),
+    path('', include('feeds.urls')),
 ]
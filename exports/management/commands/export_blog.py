@@ -0,0 +1,36 @@
+import sys
+
+from django.core.management.base import BaseCommand
+from django.utils.dateparse import parse_datetime
+
+from exports.utils import export_posts_query, export_users_query, gzip_chunks, ndjson_lines
+
+
+class Command(BaseCommand):
+    help = 'Stream posts or users as newline delimited JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('resource', choices=['posts', 'users'])
+        parser.add_argument('--output', default='-', help='File to write, standard output by default.')
+        parser.add_argument('--gzip', action='store_true', help='Compress output with gzip.')
+        parser.add_argument('--author', help='Export only posts of user with this username.')
+        parser.add_argument('--created-after', type=parse_datetime, help='Export only posts created since.')
+        parser.add_argument('--created-before', type=parse_datetime, help='Export only posts created before.')
+
+    def handle(self, *args, **options):
+        if options['resource'] == 'posts':
+            query = export_posts_query(options['author'], options['created_after'], options['created_before'])
+        else:
+            query = export_users_query()
+
+        chunks = ndjson_lines(query)
+        if options['gzip']:
+            chunks = gzip_chunks(chunks)
+
+        output = sys.stdout.buffer if options['output'] == '-' else open(options['output'], 'wb')
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+        finally:
+            if output is not sys.stdout.buffer:
+                output.close()
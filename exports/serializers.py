@@ -0,0 +1,11 @@
+from rest_framework import serializers
+
+
+class ExportQuerySerializer(serializers.Serializer):
+    gzip = serializers.BooleanField(default=False)
+
+
+class PostExportQuerySerializer(ExportQuerySerializer):
+    author = serializers.CharField(max_length=150, required=False)
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
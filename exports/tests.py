@@ -0,0 +1,99 @@
+import gzip
+import json
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APITestCase
+
+from posts.models import Post
+from tokens.models import Token
+
+User = get_user_model()
+
+
+def parse_ndjson(data: bytes):
+    return [json.loads(line) for line in data.decode('utf-8').splitlines()]
+
+
+class ExportAPITests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            username='alice',
+            email='alice@example.com',
+            password='cat'
+        )
+
+        self.user = User.objects.create_user(
+            username='bob',
+            email='bob@example.com',
+            password='dog'
+        )
+
+        for i in range(3):
+            Post.objects.create(title=f'Title {i}', content='Content', author=(self.admin, self.user)[i % 2])
+
+    def provide_token(self, user):
+        token = Token(user=user)
+        token.generate()
+        token.save()
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token.access_token}')
+
+    def test_export_posts(self):
+        self.provide_token(self.admin)
+
+        resp = self.client.get('/export/posts/')
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp['Content-Type'], 'application/x-ndjson')
+        rows = parse_ndjson(resp.getvalue())
+        self.assertEqual([row['title'] for row in rows], ['Title 0', 'Title 1', 'Title 2'])
+
+    def test_export_posts_filtered_and_compressed(self):
+        self.provide_token(self.admin)
+
+        resp = self.client.get('/export/posts/', {'author': 'bob', 'gzip': 'true'})
+
+        self.assertEqual(resp['Content-Encoding'], 'gzip')
+        rows = parse_ndjson(gzip.decompress(resp.getvalue()))
+        self.assertEqual([row['title'] for row in rows], ['Title 1'])
+
+    def test_export_users(self):
+        self.provide_token(self.admin)
+
+        resp = self.client.get('/export/users/')
+
+        rows = parse_ndjson(resp.getvalue())
+        self.assertEqual([row['username'] for row in rows], ['alice', 'bob'])
+        self.assertTrue('password' not in rows[0])
+
+    def test_export_requires_staff(self):
+        self.provide_token(self.user)
+
+        resp = self.client.get('/export/posts/')
+        self.assertEqual(resp.status_code, 403)
+
+
+class ExportCommandTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='bob',
+            email='bob@example.com',
+            password='dog'
+        )
+
+        Post.objects.create(title='Post title', content='Post content', author=self.user)
+
+    def test_export_blog(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'posts.ndjson.gz')
+            call_command('export_blog', 'posts', '--gzip', '--output', path)
+
+            with gzip.open(path) as f:
+                rows = parse_ndjson(f.read())
+
+        self.assertEqual(rows[0]['title'], 'Post title')
+        self.assertEqual(rows[0]['author_id'], self.user.id)
@@ -0,0 +1,7 @@
+from django.urls import path 
+from . import views
+
+urlpatterns = [
+    path('posts/', views.PostExport.as_view(), name='post-export'),
+    path('users/', views.UserExport.as_view(), name='user-export'),
+]
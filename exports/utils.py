@@ -0,0 +1,82 @@
+import zlib
+from typing import Iterable, Iterator, Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import QuerySet
+from django.http import StreamingHttpResponse
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from posts.models import Post
+from .serializers import ExportQuerySerializer, PostExportQuerySerializer
+
+User = get_user_model()
+
+POST_EXPORT_FIELDS = ('id', 'title', 'content', 'created_at', 'updated_at', 'author_id')
+USER_EXPORT_FIELDS = ('id', 'username', 'email', 'about_me', 'member_since', 'last_seen')
+
+
+def export_posts_query(author: Optional[str] = None, created_after=None, created_before=None) -> QuerySet:
+    """Posts to export as plain dicts ordered by id."""
+    query = Post.objects.order_by('id')
+    if author is not None:
+        query = query.filter(author__username=author)
+    if created_after is not None:
+        query = query.filter(created_at__gte=created_after)
+    if created_before is not None:
+        query = query.filter(created_at__lt=created_before)
+    return query.values(*POST_EXPORT_FIELDS)
+
+
+def export_users_query() -> QuerySet:
+    """Users to export as plain dicts ordered by id."""
+    return User.objects.order_by('id').values(*USER_EXPORT_FIELDS)
+
+
+def ndjson_lines(query: QuerySet) -> Iterator[bytes]:
+    """Encode rows as newline delimited JSON, reading them from server side cursor."""
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    for row in query.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE):
+        yield encoder.encode(row).encode('utf-8') + b'\n'
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Compress stream of chunks on the fly."""
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_response(query: QuerySet, gzip: bool) -> StreamingHttpResponse:
+    """Stream rows of query as NDJSON response."""
+    lines = ndjson_lines(query)
+    response = StreamingHttpResponse(gzip_chunks(lines) if gzip else lines, content_type='application/x-ndjson')
+    if gzip:
+        response['Content-Encoding'] = 'gzip'
+    return response
+
+
+def export_posts(request: Request):
+    """Export posts and send streaming response."""
+    params = PostExportQuerySerializer(data=request.query_params)
+    if not params.is_valid():
+        return Response(params.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    filters = dict(params.validated_data)
+    gzip = filters.pop('gzip')
+    return export_response(export_posts_query(**filters), gzip)
+
+
+def export_users(request: Request):
+    """Export users and send streaming response."""
+    params = ExportQuerySerializer(data=request.query_params)
+    if not params.is_valid():
+        return Response(params.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    return export_response(export_users_query(), params.validated_data['gzip'])
@@ -0,0 +1,35 @@
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiResponse, extend_schema
+from rest_framework.views import APIView
+from rest_framework.request import Request
+from rest_framework.permissions import IsAdminUser
+
+from tokens.authentication import CustomTokenAuthentication, CustomTokenAuthenticationScheme
+from .serializers import ExportQuerySerializer, PostExportQuerySerializer
+from .utils import export_posts, export_users
+
+NDJSON_RESPONSE = OpenApiResponse(OpenApiTypes.BINARY, description='Newline delimited JSON stream.')
+
+
+class PostExport(APIView):
+    permission_classes = [IsAdminUser]
+    authentication_classes = [CustomTokenAuthentication]
+
+    @extend_schema(
+        summary='Export all posts', tags=['Export'], responses=NDJSON_RESPONSE,
+        parameters=[PostExportQuerySerializer, CustomTokenAuthenticationScheme])
+    def get(self, request: Request):
+        """Export all posts."""
+        return export_posts(request)
+
+
+class UserExport(APIView):
+    permission_classes = [IsAdminUser]
+    authentication_classes = [CustomTokenAuthentication]
+
+    @extend_schema(
+        summary='Export all users', tags=['Export'], responses=NDJSON_RESPONSE,
+        parameters=[ExportQuerySerializer, CustomTokenAuthenticationScheme])
+    def get(self, request: Request):
+        """Export all users."""
+        return export_users(request)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from feeds.utils import trim_overgrown_timelines
+
+
+class Command(BaseCommand):
+    help = 'Cut home timelines that outgrew size cap by more than slack.'
+
+    def handle(self, *args, **options):
+        trimmed = trim_overgrown_timelines()
+        self.stdout.write(f'Trimmed {trimmed} timelines.')
@@ -0,0 +1,31 @@
+from django.db import models
+from django.contrib.auth import get_user_model
+
+from posts.models import Post
+
+User = get_user_model()
+
+
+class TimelineEntry(models.Model):
+    """Django ORM model to represent materialized home timelines table."""
+    user = models.ForeignKey(User, related_name='timeline', on_delete=models.CASCADE, db_index=False)
+    post = models.ForeignKey(Post, related_name='timeline_entries', on_delete=models.CASCADE)
+    author = models.ForeignKey(User, related_name='+', on_delete=models.CASCADE)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'], name='timeline_user_post_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'created_at', 'post'], name='timeline_user_created_idx'),
+            models.Index(fields=['user', 'author'], name='timeline_user_author_idx'),
+        ]
+
+    @property
+    def last_modified(self):
+        """Get time timeline entry post was last changed."""
+        return self.post.last_modified
+
+    def __str__(self):
+        return f'{self.user_id} timeline entry {self.post_id}'
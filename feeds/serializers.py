@@ -0,0 +1,29 @@
+from rest_framework import serializers
+
+from posts.serializers import PostSerializer
+from .models import TimelineEntry
+
+
+class TimelineEntrySerializer(serializers.Serializer):
+    """DRF serializer rendering timeline entry as its post."""
+    expandable_fields = PostSerializer.expandable_fields
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.post_options = {'fields': fields, 'expand': expand}
+
+    @classmethod
+    def readable_fields(cls):
+        """Names of fields serializer can render."""
+        return PostSerializer.readable_fields()
+
+    @classmethod
+    def restrict_queryset(cls, query, fields, expand):
+        """Fetch only post columns needed to render given fields."""
+        if 'author' not in expand:
+            query = query.select_related(None).select_related('post')
+        columns = PostSerializer.columns(fields, expand, prefix='post__')
+        return query.only('id', 'user_id', 'created_at', 'post_id', *columns)
+
+    def to_representation(self, instance: TimelineEntry):
+        return PostSerializer(instance.post, **self.post_options).data
@@ -0,0 +1,175 @@
+import base64
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.test import APITestCase
+
+from django_project.testing import QueryBudgetMixin
+from posts.models import Post
+from .utils import backfill_timeline, fan_out_post, fan_out_posts, prune_timeline, trim_overgrown_timelines
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    def setUp(self):
+        self.u1 = User.objects.create_user(
+            username='bob',
+            email='bob@example.com',
+            password='dog'
+        )
+
+        self.u2 = User.objects.create_user(
+            username='alice',
+            email='alice@example.com',
+            password='cat'
+        )
+
+    def timeline(self, user):
+        return list(user.timeline.order_by('-created_at', '-post_id').values_list('post__title', flat=True))
+
+    def test_fan_out_post(self):
+        self.u1.follow(self.u2)
+        post = Post.objects.create(title='Title', content='Content', author=self.u2)
+
+        fan_out_post(post)
+
+        self.assertEqual(self.timeline(self.u1), ['Title'])
+        self.assertEqual(self.timeline(self.u2), [])
+
+    def test_backfill_and_prune_timeline(self):
+        Post.objects.create(title='First', content='Content', author=self.u2)
+        Post.objects.create(title='Second', content='Content', author=self.u2)
+
+        self.u1.follow(self.u2)
+        backfill_timeline(self.u1, self.u2)
+        self.assertEqual(self.timeline(self.u1), ['Second', 'First'])
+
+        self.u1.unfollow(self.u2)
+        prune_timeline(self.u1, self.u2)
+        self.assertEqual(self.timeline(self.u1), [])
+
+    @override_settings(FEED_FANOUT_BATCH_SIZE=4)
+    def test_fan_out_posts_batches_rows(self):
+        followers = [self.u1] + [
+            User.objects.create_user(username=f'user{i}', email=f'user{i}@example.com', password='pass')
+            for i in range(2)
+        ]
+        for follower in followers:
+            follower.follow(self.u2)
+        posts = [Post.objects.create(title=f'Title {i}', content='Content', author=self.u2) for i in range(2)]
+
+        # one follower read plus two inserts for six rows
+        with self.assertNumQueries(3):
+            fan_out_posts(posts)
+
+        for follower in followers:
+            self.assertEqual(self.timeline(follower), ['Title 1', 'Title 0'])
+
+    @override_settings(FEED_MAX_ENTRIES=2, FEED_TRIM_SLACK=1)
+    def test_timeline_size_cap(self):
+        self.u1.follow(self.u2)
+        for i in range(3):
+            fan_out_post(Post.objects.create(title=f'Title {i}', content='Content', author=self.u2))
+
+        # fan-out only inserts, timelines within slack are left alone
+        self.assertEqual(trim_overgrown_timelines(), 0)
+        self.assertEqual(len(self.timeline(self.u1)), 3)
+
+        fan_out_post(Post.objects.create(title='Title 3', content='Content', author=self.u2))
+        self.assertEqual(trim_overgrown_timelines(), 1)
+        self.assertEqual(self.timeline(self.u1), ['Title 3', 'Title 2'])
+
+
+class FeedAPITests(APITestCase):
+    def setUp(self):
+        self.u1 = User.objects.create_user(
+            username='bob',
+            email='bob@example.com',
+            password='dog'
+        )
+
+        self.u2 = User.objects.create_user(
+            username='alice',
+            email='alice@example.com',
+            password='cat'
+        )
+
+    def provide_auth(self, username, password):
+        credentials = base64.b64encode(f'{username}:{password}'.encode()).decode('ascii')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Basic {credentials}')
+
+        resp = self.client.post('/tokens/')
+        access_token = resp.data['access_token']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+
+    def test_feed_follows_writes(self):
+        Post.objects.create(title='Old post', content='Content', author=self.u2)
+
+        self.provide_auth('bob', 'dog')
+        resp = self.client.post(f'/me/following/{self.u2.id}/')
+        self.assertEqual(resp.status_code, 201)
+
+        self.provide_auth('alice', 'cat')
+        resp = self.client.post('/posts/', {'title': 'New post', 'content': 'Content'})
+        self.assertEqual(resp.status_code, 201)
+
+        self.provide_auth('bob', 'dog')
+        resp = self.client.get('/me/feed/?cursor=')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([p['title'] for p in resp.data['data']], ['New post', 'Old post'])
+        self.assertEqual(resp.data['data'][0]['author']['username'], 'alice')
+
+        resp = self.client.delete(f'/me/following/{self.u2.id}/')
+        self.assertEqual(resp.status_code, 204)
+
+        resp = self.client.get('/me/feed/')
+        self.assertEqual(resp.data['data'], [])
+
+    def test_feed_requires_auth(self):
+        resp = self.client.get('/me/feed/')
+        self.assertEqual(resp.status_code, 403)
+
+    def test_feed_cursor_pages(self):
+        self.u1.follow(self.u2)
+        for i in range(3):
+            fan_out_post(Post.objects.create(title=f'Title {i}', content='Content', author=self.u2))
+        self.provide_auth('bob', 'dog')
+
+        resp = self.client.get('/me/feed/?limit=2&cursor=')
+        self.assertEqual([p['title'] for p in resp.data['data']], ['Title 2', 'Title 1'])
+
+        resp = self.client.get(f'/me/feed/?limit=2&cursor={resp.data["next"]}')
+        self.assertEqual([p['title'] for p in resp.data['data']], ['Title 0'])
+        self.assertIsNone(resp.data['next'])
+
+    def test_feed_selected_fields(self):
+        self.u1.follow(self.u2)
+        fan_out_post(Post.objects.create(title='Title', content='Content', author=self.u2))
+        self.provide_auth('bob', 'dog')
+
+        resp = self.client.get('/me/feed/?fields=title,author')
+        self.assertEqual(resp.data['data'], [{'title': 'Title', 'author': self.u2.id}])
+
+
+class FeedQueryBudgetTests(QueryBudgetMixin, APITestCase):
+    """Home timeline must not issue queries per rendered post."""
+    budgets = {
+        '/me/feed/': 2,
+        '/me/feed/?cursor=': 2,
+    }
+    page_size = 10
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.budget_user = User.objects.create_user(username='bob', email='bob@example.com', password='dog')
+        authors = User.objects.bulk_create(
+            User(username=f'user{i}', email=f'user{i}@example.com')
+            for i in range(3)
+        )
+        for author in authors:
+            cls.budget_user.follow(author)
+        fan_out_posts(Post.objects.bulk_create(
+            Post(title=f'Title {i}', content='Content', author=authors[i % 3])
+            for i in range(15)
+        ))
@@ -0,0 +1,6 @@
+from django.urls import path 
+from . import views
+
+urlpatterns = [
+    path('me/feed/', views.FeedList.as_view(), name='feed-list'),
+]
@@ -0,0 +1,111 @@
+from itertools import islice
+from typing import Iterable
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Count
+from rest_framework.request import Request
+
+from posts.models import Post
+from users.utils import paginated_response
+from .models import TimelineEntry
+from .serializers import TimelineEntrySerializer
+
+User = get_user_model()
+
+TRIM_TIMELINES_SQL = '''
+DELETE FROM {table} WHERE id IN (
+    SELECT id FROM (
+        SELECT id, ROW_NUMBER() OVER (
+            PARTITION BY user_id ORDER BY created_at DESC, post_id DESC
+        ) AS position
+        FROM {table} WHERE user_id IN ({placeholders})
+    ) ranked WHERE position > %s
+)
+'''
+
+
+def trim_timelines(user_ids: list):
+    """Drop timeline entries exceeding per user size cap."""
+    if not user_ids:
+        return
+    sql = TRIM_TIMELINES_SQL.format(
+        table=connection.ops.quote_name(TimelineEntry._meta.db_table),
+        placeholders=', '.join(['%s'] * len(user_ids))
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*user_ids, settings.FEED_MAX_ENTRIES])
+
+
+def trim_overgrown_timelines() -> int:
+    """Trim timelines that outgrew size cap by more than slack, returns number of trimmed timelines."""
+    user_ids = list(
+        TimelineEntry.objects.values('user_id').annotate(entries=Count('id'))
+        .filter(entries__gt=settings.FEED_MAX_ENTRIES + settings.FEED_TRIM_SLACK)
+        .values_list('user_id', flat=True)
+    )
+    for start in range(0, len(user_ids), settings.FEED_FANOUT_BATCH_SIZE):
+        trim_timelines(user_ids[start:start + settings.FEED_FANOUT_BATCH_SIZE])
+    return len(user_ids)
+
+
+def fan_out_post(post: Post):
+    """Push new post into timelines of all author followers."""
+    fan_out_posts([post])
+
+
+def fan_out_posts(posts: list):
+    """Push new posts of single author into timelines of all author followers."""
+    if not posts:
+        return
+    followers = User.objects.filter(following=posts[0].author_id).values_list('id', flat=True)
+    insert_timeline_entries(posts, followers.iterator(chunk_size=settings.FEED_FANOUT_BATCH_SIZE))
+
+
+def insert_timeline_entries(posts: list, user_ids: Iterable):
+    """Insert posts into given user timelines, at most FEED_FANOUT_BATCH_SIZE rows per insert."""
+    entries = (
+        TimelineEntry(user_id=user_id, post=post, author_id=post.author_id, created_at=post.created_at)
+        for user_id in user_ids for post in posts
+    )
+    while True:
+        batch = list(islice(entries, settings.FEED_FANOUT_BATCH_SIZE))
+        if not batch:
+            return
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def backfill_timeline(user: User, followed: User):
+    """Copy recent posts of followed user into user timeline."""
+    backfill_timeline_from(user, [followed.id])
+
+
+def backfill_timeline_from(user: User, author_ids: list):
+    """Copy recent posts of many followed users into user timeline."""
+    if not author_ids:
+        return
+    posts = Post.objects.filter(author_id__in=author_ids) \
+        .order_by('-created_at', '-id') \
+        .values_list('id', 'author_id', 'created_at')[:settings.FEED_MAX_ENTRIES]
+    TimelineEntry.objects.bulk_create([
+        TimelineEntry(user=user, post_id=post_id, author_id=author_id, created_at=created_at)
+        for post_id, author_id, created_at in posts
+    ], ignore_conflicts=True)
+    trim_timelines([user.id])
+
+
+def prune_timeline(user: User, unfollowed: User):
+    """Remove unfollowed user posts from user timeline."""
+    prune_timeline_from(user, [unfollowed.id])
+
+
+def prune_timeline_from(user: User, author_ids: list):
+    """Remove posts of many unfollowed users from user timeline."""
+    TimelineEntry.objects.filter(user=user, author_id__in=author_ids).delete()
+
+
+@paginated_response(TimelineEntrySerializer, ordering=('-created_at', '-post_id'))
+def get_feed(request: Request):
+    """Retrieve current user home timeline."""
+    return TimelineEntry.objects.filter(user=request.user).select_related('post__author')
@@ -0,0 +1,22 @@
+from drf_spectacular.utils import extend_schema
+from rest_framework.views import APIView
+from rest_framework.request import Request
+from rest_framework.permissions import IsAuthenticated
+
+from tokens.authentication import CustomTokenAuthentication, CustomTokenAuthenticationScheme
+from posts.serializers import PostPaginationSerializer
+from users.serializers import PaginationQuerySerializer
+from .utils import get_feed
+
+
+class FeedList(APIView):
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [CustomTokenAuthentication]
+
+    @extend_schema(
+        summary='Retrieve authenticated user home timeline',
+        parameters=[PaginationQuerySerializer, CustomTokenAuthenticationScheme],
+        responses=PostPaginationSerializer, tags=['Feed'])
+    def get(self, request: Request):
+        """Retrieve authenticated user home timeline."""
+        return get_feed(request)
@@ -0,0 +1,68 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import get_context
+from timeit import default_timer
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.utils.timezone import now
+
+from follows.suggestions import clear_stale, compute_suggestions, stale_users, user_chunks
+
+User = get_user_model()
+
+
+def forget_connections():
+    """Drop database connections inherited from parent process without closing them under the parent."""
+    for wrapper in connections.all(initialized_only=True):
+        wrapper.connection = None
+
+
+class Command(BaseCommand):
+    help = 'Rebuild follow suggestions of users whose follow graph neighbourhood changed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Rebuild suggestions of every user.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=settings.SUGGESTIONS_CHUNK_SIZE, help='Number of users processed at once.'
+        )
+        parser.add_argument('--workers', type=int, default=1, help='Number of processes computing chunks.')
+
+    def handle(self, *args, **options):
+        started_at, start = now(), default_timer()
+        query = User.objects.all() if options['all'] else stale_users(started_at)
+        chunks = user_chunks(query, options['chunk_size'])
+
+        workers = options['workers']
+        if workers > 1 and connection.vendor == 'sqlite':
+            self.stderr.write('SQLite allows single writer, computing suggestions in one process.')
+            workers = 1
+
+        if workers > 1:
+            users, stored = self.compute_in_processes(chunks, workers)
+        else:
+            users, stored = 0, 0
+            for chunk in chunks:
+                stored += compute_suggestions(chunk)
+                users += len(chunk)
+        clear_stale(started_at)
+
+        elapsed = default_timer() - start
+        self.stdout.write(
+            f'Computed {stored} suggestions for {users} users in {elapsed:.2f}s ({users / elapsed:.0f} users/s).'
+        )
+
+    @staticmethod
+    def compute_in_processes(chunks, workers: int):
+        """Compute chunks in forked processes keeping only few chunks in flight."""
+        users, stored, pending = 0, 0, set()
+        with ProcessPoolExecutor(workers, mp_context=get_context('fork'), initializer=forget_connections) as pool:
+            for chunk in chunks:
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    stored += sum(future.result() for future in done)
+                pending.add(pool.submit(compute_suggestions, chunk))
+                users += len(chunk)
+            stored += sum(future.result() for future in pending)
+        return users, stored
@@ -1,3 +1,31 @@
 from django.db import models
+from django.contrib.auth import get_user_model
 
-# Create your models here.
+User = get_user_model()
+
+
+class Suggestion(models.Model):
+    """Django ORM model to represent precomputed follow suggestions table."""
+    user = models.ForeignKey(User, related_name='suggestions', on_delete=models.CASCADE, db_index=False)
+    candidate = models.ForeignKey(User, related_name='suggested_to', on_delete=models.CASCADE)
+    score = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'candidate'], name='suggestion_user_candidate_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'score', 'candidate'], name='suggestion_user_score_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id} suggestion {self.candidate_id}'
+
+
+class StaleSuggestions(models.Model):
+    """Django ORM model to represent users whose suggestions should be recomputed."""
+    user = models.OneToOneField(User, primary_key=True, related_name='+', on_delete=models.CASCADE)
+    marked_at = models.DateTimeField()
+
+    def __str__(self):
+        return f'{self.user_id} stale suggestions'
@@ -0,0 +1,38 @@
+from django.conf import settings
+from rest_framework import serializers
+
+
+class RelationshipsQuerySerializer(serializers.Serializer):
+    """DRF serializer for relationship lookup query validation."""
+    ids = serializers.CharField(help_text='Comma separated user ids.')
+
+    def validate_ids(self, value: str):
+        """Parse comma separated ids."""
+        try:
+            ids = {int(pk) for pk in value.split(',') if pk.strip()}
+        except ValueError:
+            raise serializers.ValidationError('Expected comma separated integers.')
+        if not ids:
+            raise serializers.ValidationError('At least one id is required.')
+        if len(ids) > settings.RELATIONSHIPS_MAX_IDS:
+            raise serializers.ValidationError(f'At most {settings.RELATIONSHIPS_MAX_IDS} ids are allowed.')
+        return ids
+
+
+class FollowBatchSerializer(serializers.Serializer):
+    """DRF serializer for bulk follow and unfollow data validation."""
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=1000)
+
+
+class FollowBatchResultSerializer(serializers.Serializer):
+    """DRF serializer for bulk follow result."""
+    followed = serializers.ListField(child=serializers.IntegerField())
+    already_following = serializers.ListField(child=serializers.IntegerField())
+    not_found = serializers.ListField(child=serializers.IntegerField())
+
+
+class UnfollowBatchResultSerializer(serializers.Serializer):
+    """DRF serializer for bulk unfollow result."""
+    unfollowed = serializers.ListField(child=serializers.IntegerField())
+    not_following = serializers.ListField(child=serializers.IntegerField())
+    not_found = serializers.ListField(child=serializers.IntegerField())
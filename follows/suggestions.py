@@ -0,0 +1,79 @@
+import heapq
+from datetime import datetime
+from itertools import groupby
+from operator import itemgetter
+from typing import Iterator
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef, Q
+from django.utils.timezone import now
+
+from users.models import Follow
+from .models import StaleSuggestions, Suggestion
+
+User = get_user_model()
+
+
+def mark_stale(*user_ids: int):
+    """Mark users whose follow edges changed, their suggestions and suggestions of their followers are recomputed."""
+    marked_at = now()
+    StaleSuggestions.objects.bulk_create(
+        [StaleSuggestions(user_id=pk, marked_at=marked_at) for pk in user_ids],
+        # conflict target is given by column, Django 4.1 quotes unique fields verbatim
+        update_conflicts=True, unique_fields=['user_id'], update_fields=['marked_at']
+    )
+
+
+def candidate_scores(user_ids: list):
+    """Rows of user, second degree neighbour not followed yet and number of followed users following it."""
+    followed = Follow.objects.filter(follower_id=OuterRef('user_id'), followed_id=OuterRef('followed_id'))
+    return (
+        Follow.objects.filter(follower__follower_edges__follower_id__in=user_ids)
+        .annotate(user_id=F('follower__follower_edges__follower_id'))
+        .exclude(followed_id=F('user_id'))
+        .filter(~Exists(followed))
+        .values('user_id', 'followed_id')
+        .annotate(score=Count('id'))
+        .order_by('user_id')
+        .values_list('user_id', 'followed_id', 'score')
+    )
+
+
+def compute_suggestions(user_ids: list) -> int:
+    """Replace suggestions of users with best scored candidates, returns number of stored suggestions."""
+    rows = candidate_scores(user_ids).iterator(chunk_size=settings.SUGGESTIONS_CHUNK_SIZE * 10)
+    suggestions = [
+        Suggestion(user_id=user_id, candidate_id=candidate_id, score=score)
+        for user_id, candidates in groupby(rows, key=itemgetter(0))
+        for _, candidate_id, score in heapq.nlargest(
+            settings.SUGGESTIONS_PER_USER, candidates, key=lambda row: (row[2], -row[1])
+        )
+    ]
+    with transaction.atomic():
+        Suggestion.objects.filter(user_id__in=user_ids).delete()
+        Suggestion.objects.bulk_create(suggestions, batch_size=1000)
+    return len(suggestions)
+
+
+def stale_users(marked_before: datetime):
+    """Users marked stale and followers of them, their second degree neighbourhood changed."""
+    stale = StaleSuggestions.objects.filter(marked_at__lte=marked_before).values('user_id')
+    return User.objects.filter(Q(pk__in=stale) | Q(following_edges__followed_id__in=stale)).distinct()
+
+
+def user_chunks(query, chunk_size: int) -> Iterator[list]:
+    """Split user query into chunks of ids walking primary key index."""
+    last_pk = 0
+    while True:
+        pks = list(query.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:chunk_size])
+        if not pks:
+            return
+        yield pks
+        last_pk = pks[-1]
+
+
+def clear_stale(marked_before: datetime):
+    """Forget users processed by suggestions run, users marked during the run stay stale."""
+    StaleSuggestions.objects.filter(marked_at__lte=marked_before).delete()
@@ -1,9 +1,22 @@
 import base64
+from io import StringIO
+from datetime import datetime, timezone
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APITestCase
 
+from django_project.testing import QueryBudgetMixin
+from feeds.models import TimelineEntry
+from posts.models import Post
+from users.cache import follow_checks
+from users.models import Follow
+from .models import StaleSuggestions, Suggestion
+
 User = get_user_model()
 
 
@@ -38,6 +51,31 @@ class FollowSystemTests(TestCase):
         self.assertFalse(self.u1.is_followed_by(self.u2))
         self.assertFalse(self.u2.is_following(self.u1)) 
 
+    def test_follow_check_query(self):
+        cache.clear()
+        follow_checks.clear()
+        with self.assertNumQueries(1):
+            self.assertFalse(self.u1.is_following(self.u2))
+        # cold user checks are counted in process only
+        self.assertEqual(follow_checks[self.u1.pk][0], 1)
+
+    @override_settings(FOLLOW_SET_HOT_THRESHOLD=1)
+    def test_cached_follow_set(self):
+        cache.clear()
+        follow_checks.clear()
+        self.assertFalse(self.u1.is_following(self.u2))
+        with self.assertNumQueries(0):
+            self.assertFalse(self.u1.is_following(self.u2))
+
+        self.u1.follow(self.u2)
+        self.assertTrue(self.u1.is_following(self.u2))
+        with self.assertNumQueries(0):
+            self.assertTrue(self.u1.is_following(self.u2))
+            self.assertFalse(self.u1.is_following(self.u1))
+
+        self.u1.unfollow(self.u2)
+        self.assertFalse(self.u1.is_following(self.u2))
+
 
 class FollowsAPITests(APITestCase):
     def setUp(self):
@@ -86,6 +124,120 @@ class FollowsAPITests(APITestCase):
         resp = self.client.get(f'/me/following/{user_to_check}/')
         self.assertEqual(resp.status_code, 204) 
 
+    def test_follow_check_skips_user_lookup(self):
+        self.u1.follow(self.u2)
+        self.provide_auth()
+        self.client.get(f'/me/following/{self.u2.id}/')
+
+        # followed user is never loaded, missing user is told apart from not followed one
+        with self.assertNumQueries(1):
+            resp = self.client.get(f'/me/following/{self.u2.id}/')
+        self.assertEqual(resp.status_code, 204)
+
+        resp = self.client.get('/me/following/999/')
+        self.assertEqual(resp.status_code, 404)
+        self.assertEqual(resp.data['detail'], 'Not found.')
+        resp = self.client.get(f'/me/following/{self.u1.id}/')
+        self.assertEqual(resp.status_code, 404)
+        self.assertIsNone(resp.data)
+
+    def test_retrieve_relationships(self):
+        u3 = User.objects.create_user(username='carol', email='carol@example.com', password='cow')
+        self.u1.follow(self.u2)
+        u3.follow(self.u1)
+        self.provide_auth()
+
+        resp = self.client.get(f'/me/relationships/?ids={self.u2.id},{u3.id},999')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json(), {
+            str(self.u2.id): {'following': True, 'followed_by': False},
+            str(u3.id): {'following': False, 'followed_by': True},
+            '999': {'following': False, 'followed_by': False},
+        })
+
+        with CaptureQueriesContext(connection) as one:
+            self.client.get(f'/me/relationships/?ids={self.u2.id}')
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(f'/me/relationships/?ids={",".join(str(pk) for pk in range(1, 301))}')
+        self.assertEqual(len(one), len(many))
+
+        resp = self.client.get('/me/relationships/?ids=1,x')
+        self.assertEqual(resp.status_code, 400)
+
+    def test_bulk_follow_users(self):
+        users = [
+            User.objects.create_user(username=f'user{i}', email=f'user{i}@example.com', password='cow')
+            for i in range(5)
+        ]
+        Post.objects.create(title='Hello', content='World', author=users[0])
+        self.u1.follow(users[1])
+        self.provide_auth()
+
+        resp = self.client.post('/me/following/bulk/', {'ids': [users[0].id, users[1].id, 999]}, format='json')
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(resp.data, {'followed': [users[0].id], 'already_following': [users[1].id], 'not_found': [999]})
+        self.assertEqual(TimelineEntry.objects.filter(user=self.u1).count(), 1)
+
+        with CaptureQueriesContext(connection) as one:
+            self.client.post('/me/following/bulk/', {'ids': [users[2].id]}, format='json')
+        with CaptureQueriesContext(connection) as many:
+            self.client.post('/me/following/bulk/', {'ids': [user.id for user in users[3:]]}, format='json')
+        self.assertEqual(len(one), len(many))
+
+        self.u1.refresh_from_db()
+        users[3].refresh_from_db()
+        self.assertEqual((self.u1.following_count, users[3].follower_count), (5, 1))
+
+        resp = self.client.delete('/me/following/bulk/', {'ids': [user.id for user in users]}, format='json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['unfollowed'], sorted(user.id for user in users))
+        self.u1.refresh_from_db()
+        self.assertEqual(self.u1.following_count, 0)
+        self.assertFalse(TimelineEntry.objects.filter(user=self.u1).exists())
+
+    def test_retrieve_suggestions(self):
+        u3, c, d = [
+            User.objects.create_user(username=name, email=f'{name}@example.com', password='cow')
+            for name in ('carol', 'dave', 'erin')
+        ]
+        self.u2.follow(c)
+        self.u2.follow(d)
+        self.u2.follow(self.u1)
+        u3.follow(c)
+        self.provide_auth()
+        self.client.post(f'/me/following/{self.u2.id}/')
+        self.client.post(f'/me/following/{u3.id}/')
+        self.assertTrue(StaleSuggestions.objects.filter(user=self.u1).exists())
+
+        call_command('compute_suggestions', stdout=StringIO())
+        self.assertFalse(StaleSuggestions.objects.exists())
+        self.assertEqual(
+            list(Suggestion.objects.filter(user=self.u1).order_by('-score').values_list('candidate_id', 'score')),
+            [(c.id, 2), (d.id, 1)]
+        )
+
+        self.u1.follow(d)
+        resp = self.client.get('/me/suggestions/')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([user['id'] for user in resp.data['data']], [c.id])
+
+    def test_followers_newest_first(self):
+        followers = [
+            User.objects.create_user(username=f'user{i}', email=f'user{i}@example.com', password='cow')
+            for i in range(3)
+        ]
+        for i, user in enumerate(followers):
+            user.follow(self.u1)
+            Follow.objects.filter(follower=user).update(created_at=datetime(2024, 1, 1 + i, tzinfo=timezone.utc))
+
+        resp = self.client.get(f'/users/{self.u1.id}/followers/?cursor=&limit=2')
+        self.assertEqual([user['id'] for user in resp.data['data']], [followers[2].id, followers[1].id])
+        self.assertNotIn('followed_at', resp.data['data'][0])
+
+        resp = self.client.get(f'/users/{self.u1.id}/followers/?limit=2&cursor={resp.data["next"]}')
+        self.assertEqual([user['id'] for user in resp.data['data']], [followers[0].id])
+        self.assertIsNone(resp.data['next'])
+
     def test_retrieve_authenticated_user_following(self):
         self.u1.follow(self.u2)
         self.provide_auth()
@@ -125,3 +277,25 @@ class FollowsAPITests(APITestCase):
         self.assertEqual(len(resp.data['data']), 1)
         self.assertTrue('limit' in resp.data)
         self.assertTrue('offset' in resp.data) 
+
+
+class FollowsQueryBudgetTests(QueryBudgetMixin, APITestCase):
+    """Follow lists must not issue queries per rendered user."""
+    budgets = {
+        '/users/{pk}/following/': 2,
+        '/users/{pk}/followers/': 2,
+        '/users/{pk}/followers/?cursor=': 2,
+        '/me/following/': 2,
+    }
+    page_size = 10
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.budget_user = User.objects.create_user(username='bob', email='bob@example.com', password='dog')
+        others = User.objects.bulk_create(
+            User(username=f'user{i}', email=f'user{i}@example.com')
+            for i in range(15)
+        )
+        cls.budget_user.following.add(*others)
+        for other in others:
+            other.following.add(cls.budget_user)
@@ -1,10 +1,15 @@
 from django.urls import path 
+
+from users.async_views import variant
 from . import views
 
 urlpatterns = [
+    path('me/following/bulk/', views.FollowingBatch.as_view(), name='following-batch'),
     path('me/following/<int:pk>/', views.FollowingDetail.as_view(), name='following-detail'),
     path('me/following/', views.FollowingList.as_view(), name='following-list'),
     path('me/followers/', views.FollowersList.as_view(), name='followers-list'),
-    path('users/<int:pk>/following/', views.retrieve_user_following),
-    path('users/<int:pk>/followers/', views.retrieve_user_followers),
+    path('me/suggestions/', views.SuggestionList.as_view(), name='suggestion-list'),
+    path('me/relationships/', views.RelationshipList.as_view(), name='relationship-list'),
+    path('users/<int:pk>/following/', variant(views.retrieve_user_following, views.AsyncUserFollowing.as_view())),
+    path('users/<int:pk>/followers/', variant(views.retrieve_user_followers, views.AsyncUserFollowers.as_view())),
 ]
\ No newline at end of file
@@ -1,14 +1,37 @@
 from django.contrib.auth import get_user_model
+from django.db.models import Exists, F, OuterRef, Q
 from django.http import Http404
 from rest_framework import status
 from rest_framework.request import Request
 from rest_framework.response import Response
 
+from feeds.utils import backfill_timeline, backfill_timeline_from, prune_timeline, prune_timeline_from
+from users.cache import invalidate_users
+from users.models import Follow
 from users.utils import paginated_response
 from users.serializers import UserSerializer
+from .serializers import FollowBatchSerializer, RelationshipsQuerySerializer
+from .suggestions import mark_stale
 
 User = get_user_model()
 
+# newest follows first, follow id breaks ties of follows created at the same time
+FOLLOW_ORDERING = ('-followed_at', '-follow_id')
+
+
+def following_query(pk: int):
+    """Users followed by user annotated with follow time."""
+    return User.objects.filter(follower_edges__follower_id=pk).annotate(
+        followed_at=F('follower_edges__created_at'), follow_id=F('follower_edges__id')
+    )
+
+
+def followers_query(pk: int):
+    """Followers of user annotated with follow time."""
+    return User.objects.filter(following_edges__followed_id=pk).annotate(
+        followed_at=F('following_edges__created_at'), follow_id=F('following_edges__id')
+    )
+
 
 def get_user_object(pk: int):
     """Retrieve user object or raise 404 error."""
@@ -18,13 +41,23 @@ def get_user_object(pk: int):
         raise Http404
 
 
+async def aget_user_object(pk: int):
+    """Retrieve user object or raise 404 error using async ORM."""
+    try:
+        return await User.objects.aget(pk=pk)
+    except User.DoesNotExist:
+        raise Http404
+
+
 def follow_user(request: Request, pk: int):
     """Follow user."""
     user = get_user_object(pk)
     current_user = request.user
 
-    if not current_user.is_following(user):
-        current_user.follow(user)
+    if current_user.follow(user):
+        backfill_timeline(current_user, user)
+        mark_stale(current_user.pk)
+        invalidate_users(current_user.pk, user.pk)
         return Response(status=status.HTTP_201_CREATED)
     return Response({'detail': 'You already follow this user.'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -34,46 +67,133 @@ def unfollow_user(request: Request, pk: int):
     user = get_user_object(pk) 
     current_user = request.user
 
-    if current_user.is_following(user):
-        current_user.unfollow(user)
+    if current_user.unfollow(user):
+        prune_timeline(current_user, user)
+        mark_stale(current_user.pk)
+        invalidate_users(current_user.pk, user.pk)
         return Response(status=status.HTTP_204_NO_CONTENT)
     return Response({'detail': "You don't follow this user."}, status=status.HTTP_404_NOT_FOUND)
 
 
-def is_following(request: Request, pk: int):
-    """Check if user is followed by current user."""
-    user = get_user_object(pk)
+def get_existing_ids(request: Request):
+    """Validate bulk follow data and split ids into existing and unknown users."""
+    serializer = FollowBatchSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    ids = set(serializer.validated_data['ids'])
+    existing = set(User.objects.filter(pk__in=ids).values_list('pk', flat=True))
+    return existing, sorted(ids - existing)
+
+
+def follow_users(request: Request):
+    """Follow many users at once."""
+    existing, not_found = get_existing_ids(request)
     current_user = request.user
 
-    if not current_user.is_following(user):
-        return Response(status=status.HTTP_404_NOT_FOUND)
-    return Response(status=status.HTTP_204_NO_CONTENT)
+    followed = current_user.follow_many(existing)
+    if followed:
+        backfill_timeline_from(current_user, followed)
+        mark_stale(current_user.pk)
+        invalidate_users(current_user.pk, *followed)
+
+    data = {
+        'followed': followed,
+        'already_following': sorted(existing.difference(followed)),
+        'not_found': not_found
+    }
+    return Response(data, status=status.HTTP_201_CREATED if followed else status.HTTP_200_OK)
+
+
+def unfollow_users(request: Request):
+    """Unfollow many users at once."""
+    existing, not_found = get_existing_ids(request)
+    current_user = request.user
+
+    unfollowed = current_user.unfollow_many(existing)
+    if unfollowed:
+        prune_timeline_from(current_user, unfollowed)
+        mark_stale(current_user.pk)
+        invalidate_users(current_user.pk, *unfollowed)
+
+    data = {
+        'unfollowed': unfollowed,
+        'not_following': sorted(existing.difference(unfollowed)),
+        'not_found': not_found
+    }
+    return Response(data)
 
 
-@paginated_response(UserSerializer)
+def is_following(request: Request, pk: int):
+    """Check if user is followed by current user, user existence is only checked when answer is negative."""
+    if request.user.is_following_id(pk):
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    get_user_object(pk)
+    return Response(status=status.HTTP_404_NOT_FOUND)
+
+
+def get_relationships(request: Request):
+    """Retrieve following and followed by flags of current user for many users in single query."""
+    params = RelationshipsQuerySerializer(data=request.query_params)
+    params.is_valid(raise_exception=True)
+    ids = params.validated_data['ids']
+
+    pk = request.user.pk
+    data = {user_id: {'following': False, 'followed_by': False} for user_id in sorted(ids)}
+    follows = Follow.objects.filter(
+        Q(follower_id=pk, followed_id__in=ids) | Q(followed_id=pk, follower_id__in=ids)
+    ).values_list('follower_id', 'followed_id')
+    for follower_id, followed_id in follows:
+        if follower_id == pk:
+            data[followed_id]['following'] = True
+        if followed_id == pk:
+            data[follower_id]['followed_by'] = True
+    return Response(data)
+
+
+@paginated_response(UserSerializer, ordering=('-suggestion_score', '-id'))
+def get_suggestions(request: Request):
+    """Retrieve precomputed follow suggestions of current user, users followed since last computation are skipped."""
+    pk = request.user.pk
+    followed = Follow.objects.filter(follower_id=pk, followed_id=OuterRef('pk'))
+    return User.objects.filter(suggested_to__user_id=pk).filter(~Exists(followed)).annotate(
+        suggestion_score=F('suggested_to__score')
+    )
+
+
+@paginated_response(UserSerializer, ordering=FOLLOW_ORDERING)
 def retrieve_following(request: Request):
     """Retrieve users current user is following."""
-    current_user = request.user 
-    return User.objects.filter(followers=current_user).all()
+    return following_query(request.user.pk)
 
 
-@paginated_response(UserSerializer)
+@paginated_response(UserSerializer, ordering=FOLLOW_ORDERING)
 def retrieve_followers(request: Request):
     """Retrieve current user followers."""
-    current_user = request.user 
-    return User.objects.filter(following=current_user).all()
+    return followers_query(request.user.pk)
 
 
-@paginated_response(UserSerializer)
+@paginated_response(UserSerializer, ordering=FOLLOW_ORDERING)
 def get_user_following(request: Request, pk: int):
     """Retrieve users user is following."""
     user = get_user_object(pk)
-    return User.objects.filter(followers=user).all() 
+    return following_query(user.pk)
 
 
-@paginated_response(UserSerializer)
+@paginated_response(UserSerializer, ordering=FOLLOW_ORDERING)
 def get_user_followers(request: Request, pk: int):
     """Retrieve user followers."""
     user = get_user_object(pk)
-    return User.objects.filter(following=user).all()
-    
\ No newline at end of file
+    return followers_query(user.pk)
+
+
+@paginated_response(UserSerializer, ordering=FOLLOW_ORDERING)
+async def aget_user_following(request: Request, pk: int):
+    """Retrieve users user is following using async ORM."""
+    user = await aget_user_object(pk)
+    return following_query(user.pk)
+
+
+@paginated_response(UserSerializer, ordering=FOLLOW_ORDERING)
+async def aget_user_followers(request: Request, pk: int):
+    """Retrieve user followers using async ORM."""
+    user = await aget_user_object(pk)
+    return followers_query(user.pk)
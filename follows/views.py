@@ -1,13 +1,19 @@
-from drf_spectacular.utils import extend_schema
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiResponse, extend_schema
 from rest_framework.decorators import api_view
 from rest_framework.views import APIView
 from rest_framework.request import Request
 from rest_framework.permissions import IsAuthenticated
 
 from tokens.authentication import CustomTokenAuthentication, CustomTokenAuthenticationScheme
+from tokens.throttling import UserThrottle
+from users.async_views import AsyncAPIView
 from users.serializers import PaginationQuerySerializer, UserPaginationSerializer
+from .serializers import FollowBatchResultSerializer, FollowBatchSerializer, RelationshipsQuerySerializer, \
+    UnfollowBatchResultSerializer
 from .utils import follow_user, unfollow_user, is_following, retrieve_following, retrieve_followers, \
-    get_user_followers, get_user_following
+    get_user_followers, get_user_following, aget_user_followers, aget_user_following, get_relationships, \
+    get_suggestions, follow_users, unfollow_users
 
 
 class FollowingList(APIView):
@@ -25,6 +31,8 @@ class FollowingList(APIView):
 class FollowingDetail(APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [CustomTokenAuthentication]
+    throttle_classes = [UserThrottle]
+    throttle_scope = 'follows'
 
     @extend_schema(summary='Check if current user follows this user', tags=['Follow'])
     def get(self, request: Request, pk: int):
@@ -42,6 +50,54 @@ class FollowingDetail(APIView):
         return unfollow_user(request, pk)
 
 
+class FollowingBatch(APIView):
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [CustomTokenAuthentication]
+    throttle_classes = [UserThrottle]
+    throttle_scope = 'follows'
+
+    @extend_schema(
+        summary='Follow many users', request=FollowBatchSerializer, responses=FollowBatchResultSerializer,
+        tags=['Follow'], parameters=[CustomTokenAuthenticationScheme])
+    def post(self, request: Request):
+        """Follow many users."""
+        return follow_users(request)
+
+    @extend_schema(
+        summary='Unfollow many users', request=FollowBatchSerializer, responses=UnfollowBatchResultSerializer,
+        tags=['Follow'], parameters=[CustomTokenAuthenticationScheme])
+    def delete(self, request: Request):
+        """Unfollow many users."""
+        return unfollow_users(request)
+
+
+class RelationshipList(APIView):
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [CustomTokenAuthentication]
+
+    @extend_schema(
+        summary='Retrieve relationships with many users',
+        parameters=[RelationshipsQuerySerializer, CustomTokenAuthenticationScheme],
+        responses=OpenApiResponse(OpenApiTypes.OBJECT, description='Map of user id to relationship flags.'),
+        tags=['Follow'])
+    def get(self, request: Request):
+        """Retrieve relationships with many users."""
+        return get_relationships(request)
+
+
+class SuggestionList(APIView):
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [CustomTokenAuthentication]
+
+    @extend_schema(
+        summary='Retrieve users suggested to follow',
+        parameters=[PaginationQuerySerializer, CustomTokenAuthenticationScheme],
+        responses=UserPaginationSerializer, tags=['Follow'])
+    def get(self, request: Request):
+        """Retrieve users suggested to follow."""
+        return get_suggestions(request)
+
+
 class FollowersList(APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [CustomTokenAuthentication]
@@ -70,4 +126,22 @@ def retrieve_user_following(request: Request, pk: int):
 @api_view(['GET'])
 def retrieve_user_followers(request: Request, pk: int):
     """Retrieve user followers."""
-    return get_user_followers(request, pk) 
+    return get_user_followers(request, pk)
+
+
+class AsyncUserFollowing(AsyncAPIView):
+    @extend_schema(
+        summary='Retrieve user following', parameters=[PaginationQuerySerializer],
+        responses=UserPaginationSerializer, tags=['Follow'], auth=[])
+    async def get(self, request: Request, pk: int):
+        """Retrieve user following."""
+        return await aget_user_following(request, pk)
+
+
+class AsyncUserFollowers(AsyncAPIView):
+    @extend_schema(
+        summary='Retrieve user followers', parameters=[PaginationQuerySerializer],
+        responses=UserPaginationSerializer, tags=['Follow'], auth=[])
+    async def get(self, request: Request, pk: int):
+        """Retrieve user followers."""
+        return await aget_user_followers(request, pk)
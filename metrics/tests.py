@@ -0,0 +1,54 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from tokens.cache import local_cache
+from tokens.models import Token
+from .utils import counter, counter_key, flush_counters, get_counters, increment, local_counts
+
+User = get_user_model()
+
+TEST_COUNTER = counter('tests.counter')
+
+
+class MetricsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+        local_counts.clear()
+
+    def provide_token(self, user):
+        token = Token(user=user)
+        token.generate()
+        token.save()
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token.access_token}')
+
+    def test_increment(self):
+        increment(TEST_COUNTER)
+        increment(TEST_COUNTER, 2)
+
+        self.assertEqual(get_counters()[TEST_COUNTER], 3)
+
+    def test_increment_is_counted_in_process(self):
+        increment(TEST_COUNTER)
+        self.assertIsNone(cache.get(counter_key(TEST_COUNTER)))
+
+        flush_counters()
+        self.assertEqual(cache.get(counter_key(TEST_COUNTER)), 1)
+
+    def test_retrieve_metrics(self):
+        increment(TEST_COUNTER)
+        admin = User.objects.create_superuser(username='alice', email='alice@example.com', password='cat')
+        self.provide_token(admin)
+
+        resp = self.client.get('/metrics/')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data[TEST_COUNTER], 1)
+
+    def test_retrieve_metrics_requires_staff(self):
+        user = User.objects.create_user(username='bob', email='bob@example.com', password='dog')
+        self.provide_token(user)
+
+        resp = self.client.get('/metrics/')
+        self.assertEqual(resp.status_code, 403)
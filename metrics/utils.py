@@ -0,0 +1,65 @@
+import atexit
+from collections import Counter
+from threading import Lock
+
+from django.core.cache import cache
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+COUNTERS = set()
+
+# counts collected by this process since last flush, keeps hot paths free of shared cache round trips
+local_counts = Counter()
+local_counts_lock = Lock()
+
+
+def counter(name: str) -> str:
+    """Register counter name so it is exposed by metrics endpoint."""
+    COUNTERS.add(name)
+    return name
+
+
+def counter_key(name: str) -> str:
+    """Shared cache key of counter."""
+    return f'metrics:{name}'
+
+
+def increment(name: str, delta: int = 1):
+    """Increment counter in process, counts reach shared counter when flushed."""
+    with local_counts_lock:
+        local_counts[name] += delta
+
+
+def add_to_shared_counter(name: str, delta: int):
+    """Increment counter shared by all workers."""
+    key = counter_key(name)
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        if not cache.add(key, delta, timeout=None):
+            cache.incr(key, delta)
+
+
+def flush_counters():
+    """Add counts collected in process to counters shared by all workers."""
+    with local_counts_lock:
+        counts = dict(local_counts)
+        local_counts.clear()
+    for name, delta in counts.items():
+        if delta:
+            add_to_shared_counter(name, delta)
+
+
+def get_counters() -> dict:
+    """Retrieve current value of every registered counter, other workers' counts arrive with their flushes."""
+    flush_counters()
+    values = cache.get_many([counter_key(name) for name in COUNTERS])
+    return {name: values.get(counter_key(name), 0) for name in sorted(COUNTERS)}
+
+
+atexit.register(flush_counters)
+
+
+def retrieve_metrics(request: Request):
+    """Retrieve all counters and send response."""
+    return Response(get_counters())
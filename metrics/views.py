@@ -0,0 +1,19 @@
+from drf_spectacular.utils import extend_schema
+from rest_framework.views import APIView
+from rest_framework.request import Request
+from rest_framework.permissions import IsAdminUser
+
+from tokens.authentication import CustomTokenAuthentication, CustomTokenAuthenticationScheme
+from .utils import retrieve_metrics
+
+
+class MetricsDetail(APIView):
+    permission_classes = [IsAdminUser]
+    authentication_classes = [CustomTokenAuthentication]
+
+    @extend_schema(
+        summary='Retrieve service counters', tags=['Metrics'],
+        parameters=[CustomTokenAuthenticationScheme])
+    def get(self, request: Request):
+        """Retrieve service counters."""
+        return retrieve_metrics(request)
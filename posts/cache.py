@@ -0,0 +1,59 @@
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from metrics.utils import counter, increment
+from users.cache import PAYLOAD_CACHE_VERSION
+from .models import Post
+
+POST_CACHE_HITS = counter('payload_cache.post.hits')
+POST_CACHE_MISSES = counter('payload_cache.post.misses')
+
+
+def post_key(pk: int) -> str:
+    """Cache key of serialized post."""
+    return f'payload:post:{pk}'
+
+
+def get_post_entry(pk: int) -> Optional[dict]:
+    """Retrieve cached serialized post without its author."""
+    entry = cache.get(post_key(pk), version=PAYLOAD_CACHE_VERSION)
+    increment(POST_CACHE_HITS if entry is not None else POST_CACHE_MISSES)
+    return entry
+
+
+async def aget_post_entry(pk: int) -> Optional[dict]:
+    """Retrieve cached serialized post without its author and without blocking event loop."""
+    entry = await cache.aget(post_key(pk), version=PAYLOAD_CACHE_VERSION)
+    increment(POST_CACHE_HITS if entry is not None else POST_CACHE_MISSES)
+    return entry
+
+
+def post_entry(post: Post, data: dict) -> dict:
+    """Build cache entry of serialized post, author is cached separately so profile edits don't touch posts."""
+    return {'data': data, 'author_id': post.author_id, 'last_modified': post.updated_at}
+
+
+def set_post_entry(post: Post, data: dict) -> dict:
+    """Cache serialized post."""
+    entry = post_entry(post, data)
+    cache.set(post_key(post.pk), entry, timeout=settings.PAYLOAD_CACHE_TIMEOUT, version=PAYLOAD_CACHE_VERSION)
+    return entry
+
+
+async def aset_post_entry(post: Post, data: dict) -> dict:
+    """Cache serialized post without blocking event loop."""
+    entry = post_entry(post, data)
+    await cache.aset(post_key(post.pk), entry, timeout=settings.PAYLOAD_CACHE_TIMEOUT, version=PAYLOAD_CACHE_VERSION)
+    return entry
+
+
+def invalidate_posts(pks: Iterable[int]):
+    """Drop cached serialized posts."""
+    cache.delete_many([post_key(pk) for pk in pks], version=PAYLOAD_CACHE_VERSION)
+
+
+async def ainvalidate_posts(pks: Iterable[int]):
+    """Drop cached serialized posts without blocking event loop."""
+    await cache.adelete_many([post_key(pk) for pk in pks], version=PAYLOAD_CACHE_VERSION)
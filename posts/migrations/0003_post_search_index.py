@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from posts.search import create_search_index, drop_search_index
+
+
+def forwards(apps, schema_editor):
+    create_search_index(schema_editor)
+
+
+def backwards(apps, schema_editor):
+    drop_search_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0002_post_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
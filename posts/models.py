@@ -9,7 +9,21 @@ class Post(models.Model):
     title = models.CharField(max_length=50)
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     author = models.ForeignKey(User, related_name='posts', on_delete=models.CASCADE)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='post_created_id_idx'),
+            models.Index(fields=['author', 'created_at', 'id'], name='post_author_created_id_idx'),
+        ]
+
+    @property
+    def last_modified(self):
+        """Get time post or its loaded author information was last changed."""
+        if not self._meta.get_field('author').is_cached(self):
+            return self.updated_at
+        return max(self.updated_at, self.author.last_modified)
+
     def __str__(self):
         return self.title
@@ -0,0 +1,131 @@
+import re
+from html import escape
+from typing import Iterable
+
+from django.db import connection
+from django.db.models import BooleanField, CharField, FloatField, QuerySet, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+
+SEARCH_CONFIG = 'english'
+FTS_TABLE = 'posts_post_fts'
+HIGHLIGHT_START = '<mark>'
+HIGHLIGHT_STOP = '</mark>'
+# private use characters delimit matches in raw content, snippets are escaped before they become tags
+MATCH_START = '\ue000'
+MATCH_STOP = '\ue001'
+HEADLINE_OPTIONS = f'StartSel="{MATCH_START}", StopSel="{MATCH_STOP}", MaxWords=35, MinWords=15'
+
+
+def uses_postgres(conn=connection) -> bool:
+    """Check if connection supports postgres full text search."""
+    return conn.vendor == 'postgresql'
+
+
+def create_search_index(schema_editor):
+    """Create search index and fill it with existing posts."""
+    table = Post._meta.db_table
+    if uses_postgres(schema_editor.connection):
+        schema_editor.execute(f'ALTER TABLE {table} ADD COLUMN search_vector tsvector')
+        schema_editor.execute(f'CREATE INDEX post_search_vector_idx ON {table} USING gin (search_vector)')
+        schema_editor.execute(f'UPDATE {table} SET search_vector = {search_vector_sql()}')
+    else:
+        schema_editor.execute(f'CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(title, content)')
+        schema_editor.execute(f'INSERT INTO {FTS_TABLE} (rowid, title, content) SELECT id, title, content FROM {table}')
+
+
+def drop_search_index(schema_editor):
+    """Drop search index."""
+    if uses_postgres(schema_editor.connection):
+        schema_editor.execute(f'ALTER TABLE {Post._meta.db_table} DROP COLUMN search_vector')
+    else:
+        schema_editor.execute(f'DROP TABLE {FTS_TABLE}')
+
+
+def search_vector_sql() -> str:
+    """Weighted tsvector expression over post title and content."""
+    return (
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', title), 'A') || "
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', content), 'B')"
+    )
+
+
+def index_posts(post_ids: Iterable[int]):
+    """Add or refresh posts in search index."""
+    post_ids = list(post_ids)
+    if not post_ids:
+        return
+    table = Post._meta.db_table
+    placeholders = ', '.join(['%s'] * len(post_ids))
+    with connection.cursor() as cursor:
+        if uses_postgres():
+            cursor.execute(
+                f'UPDATE {table} SET search_vector = {search_vector_sql()} WHERE id IN ({placeholders})',
+                post_ids
+            )
+        else:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', post_ids)
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, content) '
+                f'SELECT id, title, content FROM {table} WHERE id IN ({placeholders})',
+                post_ids
+            )
+
+
+def unindex_posts(post_ids: Iterable[int]):
+    """Remove deleted posts from search index."""
+    post_ids = list(post_ids)
+    if not post_ids or uses_postgres():
+        # tsvector column is dropped together with the row
+        return
+    placeholders = ', '.join(['%s'] * len(post_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', post_ids)
+
+
+def fts_query(text: str) -> str:
+    """Turn user input into FTS5 query matching all terms."""
+    return ' '.join(f'"{term}"' for term in re.findall(r'\w+', text))
+
+
+def highlight(snippet: str) -> str:
+    """Escape HTML of raw content snippet and turn match delimiters into highlight tags."""
+    return escape(snippet).replace(MATCH_START, HIGHLIGHT_START).replace(MATCH_STOP, HIGHLIGHT_STOP)
+
+
+def search_posts_query(text: str) -> QuerySet:
+    """Posts matching text annotated with 'rank' and highlighted 'snippet'."""
+    table = Post._meta.db_table
+    posts = Post.objects.select_related('author')
+
+    if uses_postgres():
+        tsquery = 'websearch_to_tsquery(%s, %s)'
+        return posts.filter(
+            RawSQL(f'{table}.search_vector @@ {tsquery}', [SEARCH_CONFIG, text], output_field=BooleanField())
+        ).annotate(
+            # ts_rank returns real, compare cursor values as double precision so ties and page bounds stay exact
+            rank=RawSQL(
+                f'ts_rank({table}.search_vector, {tsquery})::double precision',
+                [SEARCH_CONFIG, text], output_field=FloatField()
+            ),
+            snippet=RawSQL(
+                f'ts_headline(%s, {table}.content, {tsquery}, %s)',
+                [SEARCH_CONFIG, SEARCH_CONFIG, text, HEADLINE_OPTIONS], output_field=CharField()
+            ),
+        )
+
+    match = fts_query(text)
+    if not match:
+        return posts.none().annotate(rank=Value(0.0), snippet=Value(''))
+    # bm25 is lower for better matches, negate it so both backends rank descending
+    matched = f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND {FTS_TABLE}.rowid = {table}.id'
+    return posts.filter(
+        RawSQL(f'EXISTS (SELECT 1 {matched})', [match], output_field=BooleanField())
+    ).annotate(
+        rank=RawSQL(f'(SELECT -bm25({FTS_TABLE}, 10.0, 1.0) {matched})', [match], output_field=FloatField()),
+        snippet=RawSQL(
+            f"(SELECT snippet({FTS_TABLE}, 1, %s, %s, '...', 16) {matched})",
+            [MATCH_START, MATCH_STOP, match], output_field=CharField()
+        ),
+    )
@@ -1,7 +1,10 @@
+from operator import itemgetter
+
 from rest_framework import serializers
 
-from users.serializers import UserSerializer, PaginationQuerySerializer
+from users.serializers import UserSerializer, PaginationQuerySerializer, PaginationSerializer, SparseFieldsMixin
 from .models import Post
+from .search import highlight
 
 
 class PostCreateSerializer(serializers.Serializer):
@@ -18,15 +21,109 @@ class PostCreateSerializer(serializers.Serializer):
         return instance
      
 
-class PostSerializer(serializers.Serializer):
-    """DRF serializer for post model."""
+class PostBatchDeleteSerializer(serializers.Serializer):
+    """DRF serializer for post batch deletion data validation."""
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=1000)
+
+
+class PostSerializer(SparseFieldsMixin, serializers.Serializer):
+    """DRF serializer for post model.
+
+    With explicit fields author is rendered as id unless it is expanded.
+    """
     id = serializers.IntegerField(read_only=True)
     title = serializers.CharField(max_length=50)
     content = serializers.CharField() 
     created_at = serializers.DateTimeField(read_only=True)
     author = UserSerializer()
 
+    always_columns = ('id', 'created_at', 'updated_at')
+    last_modified_columns = ('updated_at',)
+    expandable_fields = ('author',)
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, fields=fields, **kwargs)
+        if fields is not None and 'author' in self.fields and 'author' not in (expand or ()):
+            self.fields['author'] = serializers.IntegerField(source='author_id', read_only=True)
+
+    @classmethod
+    def columns(cls, fields=None, expand=(), prefix=''):
+        """Model columns needed to render given fields."""
+        columns = super().columns(fields, expand, prefix)
+        if fields is None or 'author' in fields:
+            columns.remove(prefix + 'author')
+            if fields is None or 'author' in expand:
+                columns.extend(UserSerializer.columns(prefix=f'{prefix}author__'))
+            else:
+                columns.append(prefix + 'author_id')
+        return columns
+
+    @classmethod
+    def restrict_queryset(cls, query, fields, expand):
+        """Fetch only columns needed to render given fields and join author if expanded."""
+        if 'author' not in expand:
+            query = query.select_related(None)
+        return query.only(*cls.columns(fields, expand))
+
+    @classmethod
+    def values_last_modified(cls, row: dict, prefix=''):
+        """Get time data of .values() row or its fetched author was last changed."""
+        last_modified = super().values_last_modified(row, prefix)
+        if f'{prefix}author__id' in row:
+            last_modified = max(last_modified, UserSerializer.values_last_modified(row, f'{prefix}author__'))
+        return last_modified
+
+    @classmethod
+    def value_renderer(cls, name, fields, expand, prefix):
+        """Build function rendering single field from .values() row."""
+        if name != 'author':
+            return super().value_renderer(name, fields, expand, prefix)
+        if fields is not None and 'author' not in expand:
+            return itemgetter(f'{prefix}author_id')
+        plan = UserSerializer.value_plan(prefix=f'{prefix}author__')
+        return lambda row: {name: render(row) for name, render in plan}
+
+
+class PostBatchResultSerializer(serializers.Serializer):
+    """DRF serializer for post batch creation item result."""
+    status = serializers.IntegerField()
+    data = PostSerializer(required=False)
+    errors = serializers.DictField(required=False)
+
+
+class PostBatchDeleteResultSerializer(serializers.Serializer):
+    """DRF serializer for post batch deletion result."""
+    deleted = serializers.ListField(child=serializers.IntegerField())
+    not_found = serializers.ListField(child=serializers.IntegerField())
 
-class PostPaginationSerializer(PaginationQuerySerializer):
+
+class PostPaginationSerializer(PaginationSerializer):
     data = PostSerializer(many=True)
+
+
+class SearchQuerySerializer(PaginationQuerySerializer):
+    q = serializers.CharField(max_length=256)
+
+
+class HighlightField(serializers.Field):
+    """Read only field rendering search snippet as escaped HTML with highlighted matches."""
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value: str):
+        return highlight(value)
+
+
+class PostSearchSerializer(PostSerializer):
+    """DRF serializer for post search result."""
+    rank = serializers.FloatField(read_only=True)
+    snippet = HighlightField()
+
+    column_dependencies = {'rank': (), 'snippet': ()}
+
+
+class PostSearchPaginationSerializer(PaginationSerializer):
+    data = PostSearchSerializer(many=True)
     
\ No newline at end of file
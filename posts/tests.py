@@ -1,11 +1,21 @@
 import base64
 
+from asgiref.sync import async_to_sync
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.test import TestCase
-from rest_framework.test import APITestCase
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, APITestCase
 
+from django_project.testing import QueryBudgetMixin
+from metrics.utils import get_counters, local_counts
+from tokens.models import Token
+from users.renderers import ORJSONRenderer
 from .models import Post
-from .serializers import PostCreateSerializer
+from .serializers import PostCreateSerializer, PostSerializer
+from .views import AsyncPostDetail, AsyncPostList, PostDetail, PostList
 
 User = get_user_model()
 
@@ -51,6 +61,7 @@ class PostSerializerTests(TestCase):
 
 class PostAPITests(APITestCase):
     def setUp(self):
+        cache.clear()
         self.user = User.objects.create_user(
             username='bob',
             email='bob@example.com',
@@ -87,6 +98,9 @@ class PostAPITests(APITestCase):
         self.assertEqual(resp.data['author']['username'], 'bob')
         self.assertEqual(Post.objects.count(), 2)
 
+        resp = self.client.get('/users/bob/')
+        self.assertEqual(resp.data['post_count'], 1)
+
     def test_retrieve_all_posts(self):
         resp = self.client.get('/posts/')
 
@@ -126,6 +140,8 @@ class PostAPITests(APITestCase):
 
         self.assertEqual(resp.status_code, 204)
         self.assertEqual(Post.objects.count(), 0)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.post_count, 0)
 
     def test_retrieve_all_user_posts(self):
         resp = self.client.get('/users/bob/posts/')
@@ -134,3 +150,392 @@ class PostAPITests(APITestCase):
         self.assertTrue('limit' in resp.data)
         self.assertTrue('offset' in resp.data)
         self.assertEqual(len(resp.data['data']), 1)
+
+    def test_retrieve_posts_with_offset(self):
+        Post.objects.create(title='Second title', content='Second content', author=self.user)
+
+        resp = self.client.get('/posts/?limit=1&offset=1')
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.data['data']), 1)
+        self.assertEqual(resp.data['data'][0]['title'], 'Post title')
+
+    def test_retrieve_posts_with_cursor(self):
+        for i in range(4):
+            Post.objects.create(title=f'Title {i}', content='Content', author=self.user)
+
+        resp = self.client.get('/posts/?limit=2&cursor=')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([p['title'] for p in resp.data['data']], ['Title 3', 'Title 2'])
+        self.assertIsNone(resp.data['prev'])
+
+        resp = self.client.get(f'/posts/?limit=2&cursor={resp.data["next"]}')
+        self.assertEqual([p['title'] for p in resp.data['data']], ['Title 1', 'Title 0'])
+
+        next_page = self.client.get(f'/posts/?limit=2&cursor={resp.data["next"]}')
+        self.assertEqual([p['title'] for p in next_page.data['data']], ['Post title'])
+        self.assertIsNone(next_page.data['next'])
+
+        resp = self.client.get(f'/posts/?limit=2&cursor={resp.data["prev"]}')
+        self.assertEqual([p['title'] for p in resp.data['data']], ['Title 3', 'Title 2'])
+        self.assertIsNone(resp.data['prev'])
+
+    def test_retrieve_posts_with_invalid_cursor(self):
+        resp = self.client.get('/posts/?cursor=garbage')
+        self.assertEqual(resp.status_code, 400)
+
+
+class PostAsyncViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(
+            username='bob',
+            email='bob@example.com',
+            password='dog'
+        )
+
+        self.post = Post.objects.create(
+            title='Post title',
+            content='Post content',
+            author=self.user
+        )
+
+    def test_reads_match_sync_views(self):
+        for view, async_view, url, kwargs in [
+            (PostList, AsyncPostList, '/posts/?cursor=', {}),
+            (PostDetail, AsyncPostDetail, f'/posts/{self.post.id}/', {'pk': self.post.id}),
+        ]:
+            resp = view.as_view()(self.factory.get(url), **kwargs)
+            async_resp = async_to_sync(async_view.as_view())(self.factory.get(url), **kwargs)
+
+            self.assertEqual(async_resp.status_code, 200)
+            self.assertEqual(async_resp.data, resp.data)
+            self.assertEqual(async_resp['ETag'], resp['ETag'])
+
+    def test_missing_post(self):
+        resp = async_to_sync(AsyncPostDetail.as_view())(self.factory.get('/posts/0/'), pk=0)
+        self.assertEqual(resp.status_code, 404)
+
+    def test_authenticated_write(self):
+        token = Token(user=self.user)
+        token.generate()
+        token.save()
+
+        request = self.factory.post(
+            '/posts/', {'title': 'Title', 'content': 'Content'}, format='json',
+            HTTP_AUTHORIZATION=f'Bearer {token.access_token}'
+        )
+        resp = async_to_sync(AsyncPostList.as_view())(request)
+        self.assertEqual(resp.status_code, 201)
+
+        request = self.factory.post('/posts/', {}, format='json', HTTP_AUTHORIZATION='Bearer invalid')
+        resp = async_to_sync(AsyncPostList.as_view())(request)
+        self.assertEqual(resp.status_code, 403)
+
+
+class PostConditionalGetTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='bob',
+            email='bob@example.com',
+            password='dog'
+        )
+
+        self.post = Post.objects.create(
+            title='Post title',
+            content='Post content',
+            author=self.user
+        )
+
+        cache.clear()
+        local_counts.clear()
+
+    def provide_token(self):
+        token = Token(user=self.user)
+        token.generate()
+        token.save()
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token.access_token}')
+
+    def test_post_detail_etag(self):
+        url = f'/posts/{self.post.id}/'
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.has_header('Last-Modified'))
+        etag = resp['ETag']
+
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp['ETag'], etag)
+
+        self.provide_token()
+        self.client.put(url, {'title': 'Edited title'})
+
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp['ETag'], etag)
+
+    def test_post_detail_is_cached(self):
+        url = f'/posts/{self.post.id}/'
+        self.client.get(url)
+
+        with self.assertNumQueries(0):
+            resp = self.client.get(url)
+        self.assertEqual(resp.data['author']['username'], 'bob')
+        self.assertEqual(get_counters()['payload_cache.post.hits'], 1)
+
+        self.provide_token()
+        self.client.put(url, {'title': 'Edited title'})
+
+        resp = self.client.get(url)
+        self.assertEqual(resp.data['title'], 'Edited title')
+
+    def test_post_detail_if_modified_since(self):
+        url = f'/posts/{self.post.id}/'
+        resp = self.client.get(url)
+
+        resp = self.client.get(url, HTTP_IF_MODIFIED_SINCE=resp['Last-Modified'])
+        self.assertEqual(resp.status_code, 304)
+
+    def test_post_list_etag(self):
+        resp = self.client.get('/posts/')
+        etag = resp['ETag']
+
+        with self.assertNumQueries(1):
+            resp = self.client.get('/posts/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+
+        resp = self.client.get('/posts/?limit=5', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+
+        Post.objects.create(title='New title', content='New content', author=self.user)
+        resp = self.client.get('/posts/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+
+
+class PostSparseFieldsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='bob',
+            email='bob@example.com',
+            password='dog'
+        )
+
+        self.post = Post.objects.create(
+            title='Post title',
+            content='Post content',
+            author=self.user
+        )
+
+    def test_list_selected_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get('/posts/?fields=id,title,created_at')
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(set(resp.data['data'][0]), {'id', 'title', 'created_at'})
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"content"', queries[0]['sql'])
+        self.assertNotIn('JOIN', queries[0]['sql'])
+
+    def test_list_author_expansion(self):
+        resp = self.client.get('/posts/?fields=id,author')
+        self.assertEqual(resp.data['data'][0]['author'], self.user.id)
+
+        resp = self.client.get('/posts/?fields=id,author&expand=author&cursor=')
+        self.assertEqual(resp.data['data'][0]['author']['username'], 'bob')
+
+    def test_values_rendering_matches_serializer(self):
+        for fields, expand in [(None, ()), (['id', 'author'], ()), (['title', 'author'], ['author'])]:
+            query = Post.objects.select_related('author')
+            instances = PostSerializer.restrict_queryset(query, fields, expand) if fields else query
+            rows = PostSerializer.values_queryset(query, fields, expand)
+
+            self.assertEqual(
+                ORJSONRenderer().render(PostSerializer.render_values(rows, fields, expand)),
+                JSONRenderer().render(PostSerializer(instances, many=True, fields=fields, expand=expand).data)
+            )
+
+    def test_detail_selected_fields(self):
+        resp = self.client.get(f'/posts/{self.post.id}/?fields=title,author')
+
+        self.assertEqual(resp.data, {'title': 'Post title', 'author': self.user.id})
+
+    def test_unknown_fields(self):
+        resp = self.client.get('/posts/?fields=id,password')
+        self.assertEqual(resp.status_code, 400)
+
+        resp = self.client.get(f'/posts/{self.post.id}/?expand=comments')
+        self.assertEqual(resp.status_code, 400)
+
+
+class PostBatchAPITests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='bob',
+            email='bob@example.com',
+            password='dog'
+        )
+
+        self.other = User.objects.create_user(
+            username='alice',
+            email='alice@example.com',
+            password='cat'
+        )
+
+        credentials = base64.b64encode(b'bob:dog').decode('ascii')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Basic {credentials}')
+        resp = self.client.post('/tokens/')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {resp.data["access_token"]}')
+
+    def test_create_posts(self):
+        data = [{'title': f'Title {i}', 'content': 'Content'} for i in range(3)]
+
+        resp = self.client.post('/posts/batch/', data, format='json')
+
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual([item['data']['title'] for item in resp.data], ['Title 0', 'Title 1', 'Title 2'])
+        self.assertEqual(Post.objects.filter(author=self.user).count(), 3)
+
+    def test_create_posts_reports_invalid_items(self):
+        data = [{'title': 'Valid', 'content': 'Content'}, {'title': None}]
+
+        resp = self.client.post('/posts/batch/', data, format='json')
+
+        self.assertEqual(resp.status_code, 207)
+        self.assertEqual(resp.data[0]['status'], 201)
+        self.assertEqual(resp.data[1]['status'], 400)
+        self.assertTrue('title' in resp.data[1]['errors'])
+        self.assertEqual(Post.objects.count(), 1)
+
+    def test_create_posts_rejects_batch_without_valid_items(self):
+        resp = self.client.post('/posts/batch/', [], format='json')
+        self.assertEqual(resp.status_code, 400)
+
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.post('/posts/batch/', [{'title': None}], format='json')
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.data[0]['status'], 400)
+        self.assertFalse(any('UPDATE' in query['sql'] for query in queries.captured_queries))
+
+    def test_delete_posts(self):
+        own = Post.objects.create(title='Own', content='Content', author=self.user)
+
+        resp = self.client.delete('/posts/batch/', {'ids': [own.id, own.id + 100]}, format='json')
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['deleted'], [own.id])
+        self.assertEqual(resp.data['not_found'], [own.id + 100])
+        self.assertEqual(Post.objects.count(), 0)
+
+    def test_delete_posts_checks_ownership(self):
+        own = Post.objects.create(title='Own', content='Content', author=self.user)
+        foreign = Post.objects.create(title='Foreign', content='Content', author=self.other)
+
+        resp = self.client.delete('/posts/batch/', {'ids': [own.id, foreign.id]}, format='json')
+
+        self.assertEqual(resp.status_code, 403)
+        self.assertEqual(resp.data['ids'], [foreign.id])
+        self.assertEqual(Post.objects.count(), 2)
+
+
+class PostQueryBudgetTests(QueryBudgetMixin, APITestCase):
+    """Read endpoints must not issue queries per rendered post."""
+    budgets = {
+        '/posts/': 1,
+        '/posts/?cursor=': 1,
+        '/users/bob/posts/': 2,
+        '/users/bob/posts/?cursor=': 2,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        bob = User.objects.create_user(username='bob', email='bob@example.com', password='dog')
+        alice = User.objects.create_user(username='alice', email='alice@example.com', password='cat')
+        Post.objects.bulk_create(
+            Post(title=f'Title {i}', content='Content', author=(bob, alice)[i % 2])
+            for i in range(20)
+        )
+
+    def test_detail_query_budget(self):
+        cache.clear()
+        post = Post.objects.first()
+
+        with self.assertNumQueries(1):
+            resp = self.client.get(f'/posts/{post.id}/')
+        self.assertEqual(resp.data['author']['username'], post.author.username)
+
+        with self.assertNumQueries(0):
+            self.client.get(f'/posts/{post.id}/')
+
+
+class PostSearchTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='bob',
+            email='bob@example.com',
+            password='dog'
+        )
+
+        credentials = base64.b64encode(b'bob:dog').decode('ascii')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Basic {credentials}')
+        resp = self.client.post('/tokens/')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {resp.data["access_token"]}')
+
+    def create_post(self, title, content):
+        resp = self.client.post('/posts/', {'title': title, 'content': content})
+        return resp.data['id']
+
+    def search(self, query):
+        resp = self.client.get('/posts/search/', {'q': query})
+        self.assertEqual(resp.status_code, 200)
+        return resp.data['data']
+
+    def test_search_ranks_and_highlights(self):
+        self.create_post('Cooking pasta', 'A weeknight dinner.')
+        self.create_post('Travel notes', 'We ate pasta in Rome every day.')
+        self.create_post('Gardening', 'Tomatoes need sun.')
+
+        results = self.search('pasta')
+
+        self.assertEqual([p['title'] for p in results], ['Cooking pasta', 'Travel notes'])
+        self.assertIn('<mark>pasta</mark>', results[1]['snippet'])
+
+    def test_search_snippet_escapes_content(self):
+        self.create_post('Markup', 'pasta <img src=x onerror=alert(1)> pasta')
+
+        snippet = self.search('pasta')[0]['snippet']
+
+        self.assertNotIn('<img', snippet)
+        self.assertIn('&lt;img src=x onerror=alert(1)&gt;', snippet)
+        self.assertEqual(snippet.count('<mark>pasta</mark>'), 2)
+
+    def test_search_follows_updates_and_deletes(self):
+        post_id = self.create_post('Cooking pasta', 'A weeknight dinner.')
+
+        self.client.put(f'/posts/{post_id}/', {'title': 'Cooking risotto'})
+        self.assertEqual(self.search('pasta'), [])
+        self.assertEqual(len(self.search('risotto')), 1)
+
+        self.client.delete(f'/posts/{post_id}/')
+        self.assertEqual(self.search('risotto'), [])
+
+    def test_search_cursor_pages(self):
+        for i in range(3):
+            self.create_post(f'Pasta {i}', 'Pasta content')
+
+        resp = self.client.get('/posts/search/', {'q': 'pasta', 'limit': 2, 'cursor': ''})
+        first_page = [p['id'] for p in resp.data['data']]
+        resp = self.client.get('/posts/search/', {'q': 'pasta', 'limit': 2, 'cursor': resp.data['next']})
+        second_page = [p['id'] for p in resp.data['data']]
+
+        self.assertEqual(len(first_page), 2)
+        self.assertEqual(len(second_page), 1)
+        self.assertFalse(set(first_page) & set(second_page))
+
+    def test_search_requires_query(self):
+        resp = self.client.get('/posts/search/')
+        self.assertEqual(resp.status_code, 400)
+
+        self.assertEqual(self.search('"*'), [])
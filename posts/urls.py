@@ -1,7 +1,11 @@
 from django.urls import path 
+
+from users.async_views import variant
 from . import views
 
 urlpatterns = [
-    path('<int:pk>/', views.PostDetail.as_view(), name='post-detail'),
-    path('', views.PostList.as_view(), name='post-list'),
+    path('batch/', views.PostBatch.as_view(), name='post-batch'),
+    path('search/', views.PostSearch.as_view(), name='post-search'),
+    path('<int:pk>/', variant(views.PostDetail, views.AsyncPostDetail).as_view(), name='post-detail'),
+    path('', variant(views.PostList, views.AsyncPostList).as_view(), name='post-list'),
 ]
\ No newline at end of file
@@ -1,17 +1,47 @@
+from typing import Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
 from django.http import Http404
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.request import Request
 
-from users.utils import paginated_response
+from django_project.routers import primary_reads
+from feeds.utils import fan_out_post, fan_out_posts
+from users.cache import aget_user_entry, aset_user_entry, get_user_entry, invalidate_users, set_user_entry
+from users.conditional import not_modified, version_validators, with_validators
+from users.serializers import UserSerializer
+from users.utils import get_sparse_params, paginated_response
+from .cache import aget_post_entry, ainvalidate_posts, aset_post_entry, get_post_entry, invalidate_posts, \
+    set_post_entry
 from .models import Post
-from .serializers import PostCreateSerializer, PostSerializer
+from .search import index_posts, search_posts_query, unindex_posts
+from .serializers import PostCreateSerializer, PostSerializer, PostSearchSerializer, SearchQuerySerializer, \
+    PostBatchDeleteSerializer
+
+User = get_user_model()
 
 
-@paginated_response(PostSerializer)
+@paginated_response(PostSerializer, ordering=('-created_at', '-id'))
 def get_all_posts(request: Request):
-    """Retrieve all users."""
-    return Post.objects.all() 
+    """Retrieve all posts."""
+    return Post.objects.select_related('author')
+
+
+@paginated_response(PostSerializer, ordering=('-created_at', '-id'))
+async def aget_all_posts(request: Request):
+    """Retrieve all posts using async ORM."""
+    return Post.objects.select_related('author')
+
+
+@paginated_response(PostSearchSerializer, ordering=('-rank', '-id'))
+def search_posts(request: Request):
+    """Retrieve posts matching search query ordered by relevance."""
+    params = SearchQuerySerializer(data=request.query_params)
+    params.is_valid(raise_exception=True)
+    return search_posts_query(params.validated_data['q'])
 
 
 def create_post(request: Request):
@@ -20,37 +50,188 @@ def create_post(request: Request):
     if serializer.is_valid():
         post = Post(**serializer.data)
         post.author = request.user
-        post.save()
+        with transaction.atomic():
+            post.save()
+            User.adjust_counters(post.author_id, post_count=1)
+            index_posts([post.id])
+        # fan-out runs after commit, follower timelines never hold transaction open
+        fan_out_post(post)
+        invalidate_users(post.author_id)
         return Response(PostSerializer(post).data, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+def create_posts(request: Request):
+    """Create batch of posts in single transaction."""
+    if not isinstance(request.data, list) or not request.data:
+        return Response({'detail': 'Expected a non-empty list of posts.'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(request.data) > settings.POSTS_BATCH_MAX_SIZE:
+        return Response(
+            {'detail': f'Batch size is limited to {settings.POSTS_BATCH_MAX_SIZE} posts.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    items = [PostCreateSerializer(data=item) for item in request.data]
+    posts = {
+        index: Post(**item.validated_data, author=request.user)
+        for index, item in enumerate(items) if item.is_valid()
+    }
+
+    if posts:
+        with transaction.atomic():
+            Post.objects.bulk_create(posts.values())
+            User.adjust_counters(request.user.pk, post_count=len(posts))
+            index_posts(post.id for post in posts.values())
+        fan_out_posts(list(posts.values()))
+        invalidate_users(request.user.pk)
+
+    results = [
+        {'status': status.HTTP_201_CREATED, 'data': PostSerializer(posts[index]).data}
+        if index in posts else
+        {'status': status.HTTP_400_BAD_REQUEST, 'errors': item.errors}
+        for index, item in enumerate(items)
+    ]
+    if not posts:
+        response_status = status.HTTP_400_BAD_REQUEST
+    elif len(posts) == len(items):
+        response_status = status.HTTP_201_CREATED
+    else:
+        response_status = status.HTTP_207_MULTI_STATUS
+    return Response(results, status=response_status)
+
+
+def delete_posts(request: Request):
+    """Delete batch of posts owned by current user."""
+    serializer = PostBatchDeleteSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    ids = set(serializer.validated_data['ids'])
+    owners = dict(Post.objects.filter(id__in=ids).values_list('id', 'author_id'))
+    foreign = sorted(pk for pk, author_id in owners.items() if author_id != request.user.id)
+    if foreign:
+        return Response(
+            {'detail': 'This is not your post', 'ids': foreign},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    with transaction.atomic():
+        unindex_posts(owners.keys())
+        Post.objects.filter(id__in=owners.keys()).delete()
+        User.adjust_counters(request.user.pk, post_count=-len(owners))
+    invalidate_posts(owners.keys())
+    invalidate_users(request.user.pk)
+
+    data = {
+        'deleted': sorted(owners),
+        'not_found': sorted(ids - owners.keys())
+    }
+    return Response(data)
+
+
 def get_post_object(pk: int):
     """Retrieve post object by id."""
     try:
-        return Post.objects.get(pk=pk)
+        return Post.objects.select_related('author').get(pk=pk)
     except Post.DoesNotExist:
         raise Http404
 
 
+async def aget_post_object(pk: int):
+    """Retrieve post object by id using async ORM."""
+    try:
+        return await Post.objects.select_related('author').aget(pk=pk)
+    except Post.DoesNotExist:
+        raise Http404
+
+
+def get_cached_post(pk: int):
+    """Retrieve serialized post and its author through payload cache."""
+    entry = get_post_entry(pk)
+    if entry is None:
+        with primary_reads():
+            post = get_post_object(pk)
+        data = PostSerializer(post).data
+        author = set_user_entry(post.author, data.pop('author'))
+        return set_post_entry(post, data), author
+
+    author = get_user_entry(entry['author_id'])
+    if author is None:
+        try:
+            with primary_reads():
+                user = User.objects.get(pk=entry['author_id'])
+        except User.DoesNotExist:
+            invalidate_posts([pk])
+            raise Http404
+        author = set_user_entry(user, UserSerializer(user).data)
+    return entry, author
+
+
+async def aget_cached_post(pk: int):
+    """Retrieve serialized post and its author through payload cache using async ORM and cache API."""
+    entry = await aget_post_entry(pk)
+    if entry is None:
+        with primary_reads():
+            post = await aget_post_object(pk)
+        data = PostSerializer(post).data
+        author = await aset_user_entry(post.author, data.pop('author'))
+        return await aset_post_entry(post, data), author
+
+    author = await aget_user_entry(entry['author_id'])
+    if author is None:
+        try:
+            with primary_reads():
+                user = await User.objects.aget(pk=entry['author_id'])
+        except User.DoesNotExist:
+            await ainvalidate_posts([pk])
+            raise Http404
+        author = await aset_user_entry(user, UserSerializer(user).data)
+    return entry, author
+
+
+def cached_post_response(request: Request, post: dict, author: dict, fields: Optional[list], expand: list):
+    """Send cached post representation unless client copy is fresh."""
+    last_modified = max(post['last_modified'], author['last_modified'])
+    etag, last_modified = version_validators(request, [('Post', post['data']['id'], last_modified)])
+    response = not_modified(request, etag, last_modified)
+    if response is not None:
+        return response
+
+    data = {**post['data'], 'author': author['data']}
+    if fields is not None:
+        data = {name: data[name] for name in fields}
+        if 'author' in data and 'author' not in expand:
+            data['author'] = post['author_id']
+    return with_validators(Response(data), etag, last_modified)
+
+
 def get_post_by_id(request: Request, pk: int):
     """Retrieve post object by id and send response."""
-    post = get_post_object(pk)
+    fields, expand = get_sparse_params(request, PostSerializer)
+    post, author = get_cached_post(pk)
+    return cached_post_response(request, post, author, fields, expand)
+
 
-    serializer = PostSerializer(post)
-    return Response(serializer.data)
+async def aget_post_by_id(request: Request, pk: int):
+    """Retrieve post object by id and send response using async ORM."""
+    fields, expand = get_sparse_params(request, PostSerializer)
+    post, author = await aget_cached_post(pk)
+    return cached_post_response(request, post, author, fields, expand)
 
 
 def update_post(request: Request, pk: int):
     """Update post."""
     post = get_post_object(pk)
 
-    if post.author != request.user:
+    if post.author_id != request.user.id:
         return Response({'detail': 'This is not your post'}, status=status.HTTP_403_FORBIDDEN)
 
     serializer = PostCreateSerializer(post, data=request.data, partial=True)
     if serializer.is_valid():
-        serializer.save()
+        with transaction.atomic():
+            serializer.save()
+            index_posts([post.id])
+        invalidate_posts([post.id])
         post.refresh_from_db()
         return Response(PostSerializer(post).data)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -60,9 +241,14 @@ def delete_post(request: Request, pk: int):
     """Delete post."""
     post = get_post_object(pk)
 
-    if post.author != request.user:
+    if post.author_id != request.user.id:
         return Response({'detail': 'This is not your post'}, status=status.HTTP_403_FORBIDDEN)
 
-    post.delete()
+    with transaction.atomic():
+        unindex_posts([post.id])
+        post.delete()
+        User.adjust_counters(post.author_id, post_count=-1)
+    invalidate_posts([pk])
+    invalidate_users(post.author_id)
     return Response(status=status.HTTP_204_NO_CONTENT)
     
\ No newline at end of file
@@ -1,16 +1,23 @@
 from drf_spectacular.utils import extend_schema
 from rest_framework.views import APIView
 from rest_framework.request import Request
-from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
 
 from tokens.authentication import CustomTokenAuthentication, CustomTokenAuthenticationScheme
-from .serializers import PaginationQuerySerializer, PostPaginationSerializer, PostCreateSerializer, PostSerializer
-from .utils import create_post, delete_post, get_all_posts, get_post_by_id, update_post
+from tokens.throttling import UserThrottle
+from users.async_views import AsyncAPIView
+from .serializers import PaginationQuerySerializer, PostPaginationSerializer, PostCreateSerializer, PostSerializer, \
+    PostSearchPaginationSerializer, SearchQuerySerializer, PostBatchDeleteSerializer, PostBatchResultSerializer, \
+    PostBatchDeleteResultSerializer
+from .utils import create_post, delete_post, get_all_posts, get_post_by_id, update_post, search_posts, \
+    create_posts, delete_posts, aget_all_posts, aget_post_by_id
 
 
 class PostList(APIView):
     permission_classes = [IsAuthenticatedOrReadOnly]
     authentication_classes = [CustomTokenAuthentication]
+    throttle_classes = [UserThrottle]
+    throttle_scope = 'posts'
 
     @extend_schema(
         summary='Retrieve all posts', parameters=[PaginationQuerySerializer],
@@ -28,6 +35,15 @@ class PostList(APIView):
         return create_post(request) 
 
 
+class AsyncPostList(AsyncAPIView, PostList):
+    @extend_schema(
+        summary='Retrieve all posts', parameters=[PaginationQuerySerializer],
+        responses=PostPaginationSerializer, tags=['Posts'], auth=[])
+    async def get(self, request: Request):
+        """Retrieve all posts."""
+        return await aget_all_posts(request)
+
+
 class PostDetail(APIView):
     permission_classes = [IsAuthenticatedOrReadOnly]
     authentication_classes = [CustomTokenAuthentication]
@@ -50,3 +66,44 @@ class PostDetail(APIView):
     def delete(self, request: Request, pk: int):
         """Delete post."""
         return delete_post(request, pk)
+
+
+class AsyncPostDetail(AsyncAPIView, PostDetail):
+    @extend_schema(
+        summary='Retrieve post by id', responses=PostSerializer,
+        tags=['Posts'], auth=[])
+    async def get(self, request: Request, pk: int):
+        """Retrieve post by id."""
+        return await aget_post_by_id(request, pk)
+
+
+class PostSearch(APIView):
+    @extend_schema(
+        summary='Search posts', parameters=[SearchQuerySerializer],
+        responses=PostSearchPaginationSerializer, tags=['Posts'], auth=[])
+    def get(self, request: Request):
+        """Search posts by title and content."""
+        return search_posts(request)
+
+
+class PostBatch(APIView):
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [CustomTokenAuthentication]
+    throttle_classes = [UserThrottle]
+    throttle_scope = 'posts'
+
+    @extend_schema(
+        summary='Create batch of posts', request=PostCreateSerializer(many=True),
+        responses=PostBatchResultSerializer(many=True), tags=['Posts'],
+        parameters=[CustomTokenAuthenticationScheme])
+    def post(self, request: Request):
+        """Create batch of posts."""
+        return create_posts(request)
+
+    @extend_schema(
+        summary='Delete batch of posts', request=PostBatchDeleteSerializer,
+        responses=PostBatchDeleteResultSerializer, tags=['Posts'],
+        parameters=[CustomTokenAuthenticationScheme])
+    def delete(self, request: Request):
+        """Delete batch of posts."""
+        return delete_posts(request)
@@ -1,13 +1,22 @@
 from typing import Optional
 from datetime import datetime, timezone
+from time import perf_counter
 
+from asgiref.sync import sync_to_async
 from drf_spectacular.extensions import OpenApiAuthenticationExtension
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.request import Request
 from rest_framework.exceptions import AuthenticationFailed
 
-from .models import Token
+from django_project.middleware import astick_to_primary, stick_to_primary
+from django_project.routers import primary_reads
+
+from .cache import acache_token, acache_user, aget_cached_token, aget_cached_user, cache_token, cache_user, \
+    get_cached_token, get_cached_user, record_verification
+from .models import Token, hash_token
+from .stateless import deny_list, is_signed_token, load_access_token
 
 User = get_user_model()
 
@@ -18,11 +27,81 @@ def parse_token_header(token_header: str) -> str:
         return token_header.split(' ')[1]
 
 
+def verify_signed_token(token: str) -> Optional[User]:
+    """Verify self-contained access token without querying tokens table."""
+    if deny_list.is_due():
+        deny_list.sync()
+    pk = load_access_token(token)
+    if pk is None or hash_token(token) in deny_list:
+        return None
+    user = get_cached_user(pk)
+    if user is None:
+        with primary_reads():
+            user = User.objects.filter(pk=pk).first()
+        if user is not None:
+            cache_user(user)
+    return user
+
+
+async def averify_signed_token(token: str) -> Optional[User]:
+    """Verify self-contained access token without querying tokens table using async ORM."""
+    if deny_list.is_due():
+        await sync_to_async(deny_list.sync)()
+    pk = load_access_token(token)
+    if pk is None or hash_token(token) in deny_list:
+        return None
+    user = await aget_cached_user(pk)
+    if user is None:
+        with primary_reads():
+            user = await User.objects.filter(pk=pk).afirst()
+        if user is not None:
+            await acache_user(user)
+    return user
+
+
 def verify_token(token: str) -> Optional[User]:
     """Verify is access token is valid."""
-    token = Token.objects.filter(access_token=token).first()
-    if token is not None and token.access_expiration > datetime.now(tz=timezone.utc):
-        return token.user 
+    start = perf_counter()
+    if settings.STATELESS_ACCESS_TOKENS and is_signed_token(token):
+        user = verify_signed_token(token)
+        record_verification(perf_counter() - start)
+        return user
+
+    digest = hash_token(token)
+    pk = get_cached_token(digest)
+    user = get_cached_user(pk) if pk is not None else None
+    if user is None:
+        # token may have been issued moments ago, replicas can lag behind
+        with primary_reads():
+            token = Token.objects.select_related('user').filter(access_token_hash=digest).first()
+        if token is not None and token.access_expiration > datetime.now(tz=timezone.utc):
+            cache_token(digest, token.user_id, token.access_expiration)
+            cache_user(token.user)
+            user = token.user
+    record_verification(perf_counter() - start)
+    return user
+
+
+async def averify_token(token: str) -> Optional[User]:
+    """Verify is access token is valid using async ORM."""
+    start = perf_counter()
+    if settings.STATELESS_ACCESS_TOKENS and is_signed_token(token):
+        user = await averify_signed_token(token)
+        record_verification(perf_counter() - start)
+        return user
+
+    digest = hash_token(token)
+    pk = await aget_cached_token(digest)
+    user = await aget_cached_user(pk) if pk is not None else None
+    if user is None:
+        with primary_reads():
+            token = await Token.objects.select_related('user').filter(access_token_hash=digest).afirst()
+        if token is not None and token.access_expiration > datetime.now(tz=timezone.utc):
+            await acache_token(digest, token.user_id, token.access_expiration)
+            await acache_user(token.user)
+            user = token.user
+    record_verification(perf_counter() - start)
+    return user
 
 
 class CustomTokenAuthentication(BaseAuthentication):
@@ -36,12 +115,30 @@ class CustomTokenAuthentication(BaseAuthentication):
                 user = verify_token(token)
 
                 if user is not None:
+                    stick_to_primary(user.pk)
                     user.ping()
                     return (user, None)
             raise AuthenticationFailed('Invalid credentials')
         
         return None
 
+    async def aauthenticate(self, request: Request):
+        """Authenticated user with access token without blocking event loop."""
+        token_header = request.META.get('HTTP_AUTHORIZATION')
+
+        if token_header is not None:
+            token = parse_token_header(token_header)
+            if token is not None:
+                user = await averify_token(token)
+
+                if user is not None:
+                    await astick_to_primary(user.pk)
+                    await sync_to_async(user.ping)()
+                    return (user, None)
+            raise AuthenticationFailed('Invalid credentials')
+
+        return None
+
 
 class CustomTokenAuthenticationScheme(OpenApiAuthenticationExtension):
     target_class = CustomTokenAuthentication
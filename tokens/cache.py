@@ -0,0 +1,217 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from threading import Lock
+from time import monotonic
+from typing import Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from metrics.utils import counter, increment
+
+User = get_user_model()
+
+TOKEN_CACHE_VERSION = 2
+
+TOKEN_CACHE_LOCAL_HITS = counter('token_cache.local.hits')
+TOKEN_CACHE_SHARED_HITS = counter('token_cache.shared.hits')
+TOKEN_CACHE_MISSES = counter('token_cache.misses')
+TOKEN_VERIFY_MICROSECONDS = counter('token_cache.verify.microseconds')
+
+# user columns kept in snapshot, remaining ones are deferred and loaded on access
+SNAPSHOT_FIELDS = [
+    field.attname for field in User._meta.concrete_fields
+    if field.attname not in ('password', 'first_name', 'last_name', 'last_login', 'date_joined')
+]
+
+
+class LocalCache:
+    """Thread safe in-process LRU cache with per entry expiration."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key: str):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires <= monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, timeout: float):
+        with self.lock:
+            self.entries[key] = (value, monotonic() + timeout)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+local_cache = LocalCache(settings.TOKEN_LOCAL_CACHE_SIZE)
+
+
+def token_key(digest: str) -> str:
+    """Cache key of access token digest, raw tokens never leave the process."""
+    return f'auth:token:{digest}'
+
+
+def user_key(pk: int) -> str:
+    """Cache key of authenticated user snapshot, shared by all tokens of the user."""
+    return f'auth:user:{pk}'
+
+
+def user_from_snapshot(values: tuple):
+    """Build user instance from cached snapshot without querying database."""
+    return User.from_db('default', SNAPSHOT_FIELDS, values)
+
+
+def local_entry(key: str) -> Optional[dict]:
+    """Retrieve entry kept by this process."""
+    entry = local_cache.get(key)
+    if entry is not None:
+        increment(TOKEN_CACHE_LOCAL_HITS)
+    return entry
+
+
+def remember_entry(key: str, entry: Optional[dict]) -> Optional[dict]:
+    """Count shared cache lookup and keep found entry in process."""
+    if entry is None:
+        increment(TOKEN_CACHE_MISSES)
+        return None
+    increment(TOKEN_CACHE_SHARED_HITS)
+    remaining = entry['expiration'] - datetime.now(tz=timezone.utc).timestamp()
+    local_cache.set(key, entry, min(settings.TOKEN_LOCAL_CACHE_TIMEOUT, remaining))
+    return entry
+
+
+def entry_value(entry: Optional[dict]):
+    """Get value of entry unless it expired."""
+    if entry is None or entry['expiration'] <= datetime.now(tz=timezone.utc).timestamp():
+        return None
+    return entry['value']
+
+
+def get_entry(key: str):
+    """Retrieve unexpired cached value from local or shared cache."""
+    entry = local_entry(key)
+    if entry is None:
+        entry = remember_entry(key, cache.get(key, version=TOKEN_CACHE_VERSION))
+    return entry_value(entry)
+
+
+async def aget_entry(key: str):
+    """Retrieve unexpired cached value from local or shared cache without blocking event loop."""
+    entry = local_entry(key)
+    if entry is None:
+        entry = remember_entry(key, await cache.aget(key, version=TOKEN_CACHE_VERSION))
+    return entry_value(entry)
+
+
+def new_entry(key: str, value, expiration: datetime) -> Optional[tuple]:
+    """Build entry and its shared cache timeout, keep it in process."""
+    remaining = expiration.timestamp() - datetime.now(tz=timezone.utc).timestamp()
+    if remaining <= 0:
+        return None
+    entry = {'value': value, 'expiration': expiration.timestamp()}
+    local_cache.set(key, entry, min(settings.TOKEN_LOCAL_CACHE_TIMEOUT, remaining))
+    return entry, min(settings.TOKEN_CACHE_TIMEOUT, remaining)
+
+
+def set_entry(key: str, value, expiration: datetime):
+    """Cache value until expiration."""
+    entry = new_entry(key, value, expiration)
+    if entry is not None:
+        cache.set(key, entry[0], timeout=entry[1], version=TOKEN_CACHE_VERSION)
+
+
+async def aset_entry(key: str, value, expiration: datetime):
+    """Cache value until expiration without blocking event loop."""
+    entry = new_entry(key, value, expiration)
+    if entry is not None:
+        await cache.aset(key, entry[0], timeout=entry[1], version=TOKEN_CACHE_VERSION)
+
+
+def delete_entries(keys: list):
+    """Drop cached entries, other processes drop them when local entries expire."""
+    for key in keys:
+        local_cache.delete(key)
+    cache.delete_many(keys, version=TOKEN_CACHE_VERSION)
+
+
+def get_cached_token(digest: str) -> Optional[int]:
+    """Retrieve id of user authenticated by access token from local or shared cache."""
+    return get_entry(token_key(digest))
+
+
+async def aget_cached_token(digest: str) -> Optional[int]:
+    """Retrieve id of user authenticated by access token without blocking event loop."""
+    return await aget_entry(token_key(digest))
+
+
+def cache_token(digest: str, user_id: int, expiration: datetime):
+    """Cache id of user authenticated by access token until token expires."""
+    set_entry(token_key(digest), user_id, expiration)
+
+
+async def acache_token(digest: str, user_id: int, expiration: datetime):
+    """Cache id of user authenticated by access token without blocking event loop."""
+    await aset_entry(token_key(digest), user_id, expiration)
+
+
+def evict_tokens(*digests: str):
+    """Drop cached access tokens."""
+    delete_entries([token_key(digest) for digest in digests])
+
+
+def get_cached_user(pk: int) -> Optional[User]:
+    """Retrieve authenticated user snapshot by id from local or shared cache."""
+    values = get_entry(user_key(pk))
+    return user_from_snapshot(values) if values is not None else None
+
+
+async def aget_cached_user(pk: int) -> Optional[User]:
+    """Retrieve authenticated user snapshot by id without blocking event loop."""
+    values = await aget_entry(user_key(pk))
+    return user_from_snapshot(values) if values is not None else None
+
+
+def user_snapshot_expiration() -> datetime:
+    """Time cached user snapshot expires at."""
+    return datetime.now(tz=timezone.utc) + timedelta(seconds=settings.TOKEN_CACHE_TIMEOUT)
+
+
+def cache_user(user):
+    """Cache snapshot of authenticated user, profile updates evict it."""
+    values = tuple(getattr(user, name) for name in SNAPSHOT_FIELDS)
+    set_entry(user_key(user.pk), values, user_snapshot_expiration())
+
+
+async def acache_user(user):
+    """Cache snapshot of authenticated user without blocking event loop."""
+    values = tuple(getattr(user, name) for name in SNAPSHOT_FIELDS)
+    await aset_entry(user_key(user.pk), values, user_snapshot_expiration())
+
+
+def evict_users(*pks: int):
+    """Drop cached user snapshots."""
+    delete_entries([user_key(pk) for pk in pks])
+
+
+def record_verification(seconds: float):
+    """Add token verification time to metrics."""
+    increment(TOKEN_VERIFY_MICROSECONDS, int(seconds * 1_000_000))
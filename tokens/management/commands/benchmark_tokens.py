@@ -0,0 +1,76 @@
+import random
+import secrets
+from datetime import datetime, timedelta, timezone
+from statistics import mean, quantiles
+from timeit import default_timer
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from tokens.models import Token, hash_token
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Measure access and refresh token lookup latency on large token table, inserted rows are rolled back.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Number of token rows inserted.')
+        parser.add_argument('--lookups', type=int, default=1000, help='Number of measured lookups.')
+        parser.add_argument('--batch-size', type=int, default=10_000, help='Number of rows inserted at once.')
+
+    def handle(self, *args, **options):
+        rows, lookups, batch_size = options['rows'], options['lookups'], options['batch_size']
+
+        with transaction.atomic():
+            user = User.objects.create_user(username=f'benchmark-{secrets.token_hex(4)}')
+            start = default_timer()
+            samples = self.insert_tokens(user, rows, batch_size, lookups)
+            self.stdout.write(f'inserted {rows} tokens in {default_timer() - start:.1f}s')
+
+            access = [self.measure(lambda: self.lookup(access_token_hash=hash_token(a))) for a, _ in samples]
+            refresh = [self.measure(lambda: self.lookup(refresh_token_hash=hash_token(r))) for _, r in samples]
+            missing = [self.measure(lambda: self.lookup(access_token_hash=hash_token(secrets.token_urlsafe())))
+                       for _ in samples]
+
+            for name, timings in (('access', access), ('refresh', refresh), ('missing', missing)):
+                percentiles = quantiles(timings, n=100)
+                self.stdout.write(
+                    f'{name}: mean {mean(timings) * 1e6:.0f} us, p50 {percentiles[49] * 1e6:.0f} us, '
+                    f'p99 {percentiles[98] * 1e6:.0f} us'
+                )
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def insert_tokens(user, rows: int, batch_size: int, lookups: int) -> list:
+        """Insert token rows and return plain token pairs of random sample of them."""
+        sampled = set(random.sample(range(rows), min(lookups, rows)))
+        expiration = datetime.now(tz=timezone.utc) + timedelta(days=1)
+        samples = []
+        for start in range(0, rows, batch_size):
+            batch = []
+            for index in range(start, min(start + batch_size, rows)):
+                access, refresh = secrets.token_urlsafe(), secrets.token_urlsafe()
+                if index in sampled:
+                    samples.append((access, refresh))
+                batch.append(Token(
+                    user=user,
+                    access_token_hash=hash_token(access), access_expiration=expiration,
+                    refresh_token_hash=hash_token(refresh), refresh_expiration=expiration
+                ))
+            Token.objects.bulk_create(batch)
+        return samples
+
+    @staticmethod
+    def lookup(**digest):
+        """Resolve token together with its user in single query, same as authentication does."""
+        return Token.objects.select_related('user').filter(**digest).first()
+
+    @staticmethod
+    def measure(path) -> float:
+        """Run time of path in seconds."""
+        start = default_timer()
+        path()
+        return default_timer() - start
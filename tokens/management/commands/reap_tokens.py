@@ -0,0 +1,25 @@
+from timeit import default_timer
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from metrics.utils import increment
+from tokens.models import Token
+from tokens.reaper import TOKENS_REAPED
+
+
+class Command(BaseCommand):
+    help = 'Delete tokens that expired for more than a day in bounded batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.TOKEN_REAP_BATCH_SIZE, help='Number of tokens deleted at once.'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        start = default_timer()
+        deleted = Token.clean(batch_size)
+        elapsed = default_timer() - start
+        increment(TOKENS_REAPED, deleted)
+        self.stdout.write(f'Deleted {deleted} tokens in {elapsed:.2f}s ({deleted / elapsed:.0f} rows/s).')
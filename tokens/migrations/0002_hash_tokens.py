@@ -0,0 +1,64 @@
+from hashlib import sha256
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def hash_tokens(apps, schema_editor):
+    """Replace plain tokens with their digests, issued tokens stay valid."""
+    Token = apps.get_model('tokens', 'Token')
+    batch = []
+    for token in Token.objects.only('id', 'access_token', 'refresh_token').iterator(chunk_size=BATCH_SIZE):
+        token.access_token_hash = sha256(token.access_token.encode('utf-8')).hexdigest()
+        token.refresh_token_hash = sha256(token.refresh_token.encode('utf-8')).hexdigest()
+        batch.append(token)
+        if len(batch) == BATCH_SIZE:
+            Token.objects.bulk_update(batch, ['access_token_hash', 'refresh_token_hash'])
+            batch = []
+    Token.objects.bulk_update(batch, ['access_token_hash', 'refresh_token_hash'])
+
+
+def drop_tokens(apps, schema_editor):
+    """Digests can't be turned back into tokens, issued tokens are revoked."""
+    apps.get_model('tokens', 'Token').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tokens', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='token',
+            name='access_token_hash',
+            field=models.CharField(max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='token',
+            name='refresh_token_hash',
+            field=models.CharField(max_length=64, null=True),
+        ),
+        migrations.RunPython(hash_tokens, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='token',
+            name='access_token',
+        ),
+        migrations.RemoveField(
+            model_name='token',
+            name='refresh_token',
+        ),
+        migrations.RunPython(migrations.RunPython.noop, drop_tokens),
+        migrations.AlterField(
+            model_name='token',
+            name='access_token_hash',
+            field=models.CharField(max_length=64, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='token',
+            name='refresh_token_hash',
+            field=models.CharField(max_length=64, unique=True),
+        ),
+    ]
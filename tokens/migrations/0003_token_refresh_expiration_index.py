@@ -0,0 +1,18 @@
+# Generated by Django 4.1.3 on 2026-10-18 19:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tokens', '0002_hash_tokens'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='token',
+            name='refresh_expiration',
+            field=models.DateTimeField(db_index=True),
+        ),
+    ]
@@ -1,28 +1,46 @@
 import secrets
+from hashlib import sha256
 from datetime import datetime, timedelta, timezone
 
 from django.conf import settings
 from django.db import models
 from django.contrib.auth import get_user_model
 
+from .stateless import sign_access_token
+
 User = get_user_model()
 
 
+def hash_token(token: str) -> str:
+    """Get fixed width digest stored in place of token."""
+    return sha256(token.encode('utf-8')).hexdigest()
+
+
 class Token(models.Model):
-    """Django ORM model to represent 'tokens' table."""
-    access_token = models.CharField(max_length=64, db_index=True)
+    """Django ORM model to represent 'tokens' table.
+
+    Only token digests are stored, plain tokens are available right after generate().
+    """
+    access_token_hash = models.CharField(max_length=64, unique=True)
     access_expiration = models.DateTimeField()
-    refresh_token = models.CharField(max_length=64, db_index=True)
-    refresh_expiration = models.DateTimeField()
+    refresh_token_hash = models.CharField(max_length=64, unique=True)
+    refresh_expiration = models.DateTimeField(db_index=True)
 
     user = models.ForeignKey(User, related_name='tokens', on_delete=models.CASCADE)
 
     def generate(self):
         """Generate token pair."""
-        self.access_token = secrets.token_urlsafe()
         self.access_expiration = datetime.utcnow() + \
             timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        if settings.STATELESS_ACCESS_TOKENS:
+            self.access_token = sign_access_token(
+                self.user_id, self.access_expiration.replace(tzinfo=timezone.utc)
+            )
+        else:
+            self.access_token = secrets.token_urlsafe()
+        self.access_token_hash = hash_token(self.access_token)
         self.refresh_token = secrets.token_urlsafe()
+        self.refresh_token_hash = hash_token(self.refresh_token)
         self.refresh_expiration = datetime.utcnow() + \
             timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
 
@@ -32,10 +50,26 @@ class Token(models.Model):
         self.refresh_expiration = datetime.utcnow()
 
     @staticmethod
-    def clean():
+    def reap(batch_size: int) -> int:
+        """Delete single batch of tokens that expired for more than a day."""
+        yesterday = datetime.now(tz=timezone.utc) - timedelta(days=1)
+        ids = list(
+            Token.objects.filter(refresh_expiration__lt=yesterday)
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if ids:
+            Token.objects.filter(id__in=ids).delete()
+        return len(ids)
+
+    @staticmethod
+    def clean(batch_size: int = 1000) -> int:
         """Clean tokens that expired for more than a day."""
-        yesterday = datetime.utcnow() - timedelta(days=1)
-        Token.objects.filter(refresh_expiration__lt=yesterday).delete()
+        deleted = 0
+        while True:
+            count = Token.reap(batch_size)
+            deleted += count
+            if count < batch_size:
+                return deleted
 
     def __str__(self):
         return f'{self.user.username} token'    
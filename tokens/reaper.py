@@ -0,0 +1,31 @@
+import logging
+from threading import Thread
+from time import sleep
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+
+from metrics.utils import counter, increment
+from .models import Token
+
+logger = logging.getLogger(__name__)
+
+TOKENS_REAPED = counter('tokens.reaped')
+
+
+def reap_periodically(interval: int):
+    """Delete expired tokens every interval seconds."""
+    while True:
+        sleep(interval)
+        try:
+            increment(TOKENS_REAPED, Token.clean(settings.TOKEN_REAP_BATCH_SIZE))
+        except DatabaseError:
+            logger.exception('Failed to reap expired tokens')
+        finally:
+            connection.close()
+
+
+def start_reaper():
+    """Start background token reaper in worker when TOKEN_REAP_INTERVAL is set."""
+    if settings.TOKEN_REAP_INTERVAL > 0:
+        Thread(target=reap_periodically, args=(settings.TOKEN_REAP_INTERVAL,), name='token-reaper', daemon=True).start()
@@ -0,0 +1,83 @@
+import secrets
+from datetime import datetime, timedelta, timezone
+from threading import Lock
+from time import monotonic
+from typing import Optional
+
+from django.conf import settings
+from django.core import signing
+
+from metrics.utils import counter, increment
+
+ACCESS_TOKEN_SALT = 'tokens.access'
+
+TOKENS_DENIED = counter('tokens.denied')
+
+
+def sign_access_token(user_id: int, expiration: datetime) -> str:
+    """Build self-contained access token signed with SECRET_KEY."""
+    payload = {'u': user_id, 'e': int(expiration.timestamp()), 'n': secrets.token_urlsafe(6)}
+    return signing.dumps(payload, salt=ACCESS_TOKEN_SALT)
+
+
+def is_signed_token(token: str) -> bool:
+    """Check if access token is self-contained, opaque tokens never contain signature separator."""
+    return ':' in token
+
+
+def load_access_token(token: str) -> Optional[int]:
+    """Get id of user signed access token was issued to unless it is forged or expired."""
+    try:
+        payload = signing.loads(token, salt=ACCESS_TOKEN_SALT)
+    except signing.BadSignature:
+        return None
+    if payload['e'] <= datetime.now(tz=timezone.utc).timestamp():
+        return None
+    return payload['u']
+
+
+class DenyList:
+    """Digests of revoked access tokens which are not expired yet.
+
+    Every worker keeps its own copy which is rebuilt from tokens table every
+    TOKEN_DENY_LIST_SYNC_INTERVAL seconds, revocations made by other workers
+    are applied within that interval.
+    """
+
+    def __init__(self):
+        self.digests = frozenset()
+        self.lock = Lock()
+        self.synced = None
+
+    def is_due(self) -> bool:
+        """Check if deny list should be rebuilt."""
+        return self.synced is None or monotonic() - self.synced >= settings.TOKEN_DENY_LIST_SYNC_INTERVAL
+
+    def sync(self):
+        """Rebuild deny list from tokens revoked during last access token lifetime."""
+        from .models import Token
+
+        now = datetime.now(tz=timezone.utc)
+        lifetime = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        # revoked token pairs have refresh expiration set to revocation time
+        digests = frozenset(
+            Token.objects.filter(refresh_expiration__gt=now - lifetime, refresh_expiration__lte=now)
+            .values_list('access_token_hash', flat=True)
+        )
+        with self.lock:
+            self.digests = digests
+            self.synced = monotonic()
+
+    def add(self, digest: str):
+        """Deny access token in current worker right away."""
+        with self.lock:
+            self.digests = self.digests | {digest}
+
+    def __contains__(self, digest: str) -> bool:
+        denied = digest in self.digests
+        if denied:
+            increment(TOKENS_DENIED)
+        return denied
+
+
+deny_list = DenyList()
@@ -1,13 +1,26 @@
 import base64
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from io import StringIO
+from threading import Barrier
 
+from asgiref.sync import async_to_sync
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
 from rest_framework.test import APITestCase
 
-from .models import Token
+from django_project.routers import use_replica
+from metrics.utils import counter_key, get_counters, local_counts
+from posts.models import Post
+from .authentication import averify_token, verify_token
+from .cache import local_cache
+from .models import Token, hash_token
 from .serializers import TokenSerializer
+from .stateless import DenyList, deny_list
+from .throttling import THROTTLE_REJECTED, empty_buckets, take_token
 
 User = get_user_model()
 
@@ -30,6 +43,14 @@ class TokenModelTests(TestCase):
         self.assertGreater(self.token.access_expiration, datetime.utcnow())
         self.assertGreater(self.token.refresh_expiration, datetime.utcnow())
 
+    def test_token_hashed(self):
+        token = Token.objects.get(pk=self.token.pk)
+
+        self.assertEqual(token.access_token_hash, hash_token(self.token.access_token))
+        self.assertEqual(token.refresh_token_hash, hash_token(self.token.refresh_token))
+        self.assertEqual(len(token.access_token_hash), 64)
+        self.assertFalse(hasattr(token, 'access_token'))
+
     def test_token_expire(self):
         self.token.expire()
 
@@ -46,6 +67,20 @@ class TokenModelTests(TestCase):
         
         self.assertEqual(Token.objects.count(), 0)
 
+    def test_reap_tokens(self):
+        before_yesterday = datetime.utcnow() - timedelta(days=2)
+        for _ in range(3):
+            token = Token(user=self.user)
+            token.generate()
+            token.refresh_expiration = before_yesterday
+            token.save()
+
+        out = StringIO()
+        call_command('reap_tokens', '--batch-size', '2', stdout=out)
+
+        self.assertEqual(list(Token.objects.all()), [self.token])
+        self.assertIn('Deleted 3 tokens', out.getvalue())
+
 
 class TokenSerializerTests(TestCase):
     def test_valid_data(self):
@@ -120,3 +155,213 @@ class TokenAPITests(APITestCase):
         self.provide_token_auth(access_token)
         resp = self.client.get('/users/me/')
         self.assertEqual(resp.status_code, 403)
+
+
+@override_settings(STATELESS_ACCESS_TOKENS=False)
+class TokenCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+        local_counts.clear()
+        self.user = User.objects.create_user(
+            username='bob',
+            email='bob@example.com',
+            password='dog'
+        )
+        self.token = Token(user=self.user)
+        self.token.generate()
+        self.token.save()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token.access_token}')
+
+    def test_cached_verification(self):
+        with self.assertNumQueries(1):
+            verify_token(self.token.access_token)
+
+        with self.assertNumQueries(0):
+            user = verify_token(self.token.access_token)
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(user.username, 'bob')
+
+        local_cache.clear()
+        with self.assertNumQueries(0):
+            verify_token(self.token.access_token)
+
+        # token and user snapshot are separate entries
+        counters = get_counters()
+        self.assertEqual(counters['token_cache.misses'], 1)
+        self.assertEqual(counters['token_cache.local.hits'], 2)
+        self.assertEqual(counters['token_cache.shared.hits'], 2)
+
+    @override_settings(DATABASE_REPLICAS=['replica1'])
+    def test_token_lookup_reads_primary(self):
+        # replicas may not have token issued moments ago yet
+        token = use_replica.set(True)
+        self.addCleanup(use_replica.reset, token)
+
+        self.assertEqual(verify_token(self.token.access_token).pk, self.user.pk)
+
+    def test_async_verification_uses_shared_cache(self):
+        verify_token(self.token.access_token)
+        local_cache.clear()
+
+        with self.assertNumQueries(0):
+            user = async_to_sync(averify_token)(self.token.access_token)
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(get_counters()['token_cache.shared.hits'], 2)
+
+    def test_profile_update_evicts_user_snapshot(self):
+        self.assertEqual(self.client.get('/users/me/').status_code, 200)
+        Post.objects.create(title='Title', content='Content', author=self.user)
+        User.adjust_counters(self.user.pk, post_count=1)
+
+        resp = self.client.put('/users/me/', {'username': 'robert'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['post_count'], 1)
+
+        resp = self.client.get('/users/me/')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['username'], 'robert')
+        self.assertEqual(verify_token(self.token.access_token).username, 'robert')
+
+    def test_revoke_evicts_token(self):
+        resp = self.client.get('/users/me/')
+        self.assertEqual(resp.status_code, 200)
+
+        resp = self.client.delete('/tokens/', data={'refresh_token': self.token.refresh_token})
+        self.assertEqual(resp.status_code, 204)
+
+        resp = self.client.get('/users/me/')
+        self.assertEqual(resp.status_code, 403)
+        # opaque tokens are never checked against deny list
+        self.assertNotIn(self.token.access_token_hash, deny_list.digests)
+
+    def test_refresh_evicts_token(self):
+        resp = self.client.get('/users/me/')
+        self.assertEqual(resp.status_code, 200)
+
+        resp = self.client.put('/tokens/', data={'refresh_token': self.token.refresh_token})
+        self.assertEqual(resp.status_code, 201)
+
+        resp = self.client.get('/users/me/')
+        self.assertEqual(resp.status_code, 403)
+
+    def test_cached_user_update(self):
+        self.client.get('/users/me/')
+        User.objects.filter(pk=self.user.pk).update(first_name='Bob')
+
+        resp = self.client.put('/users/me/', data={'about_me': 'hello'})
+        self.assertEqual(resp.status_code, 200)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.about_me, 'hello')
+        self.assertEqual(self.user.first_name, 'Bob')
+        self.assertTrue(self.user.check_password('dog'))
+
+
+@override_settings(STATELESS_ACCESS_TOKENS=True)
+class StatelessTokenTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+        self.user = User.objects.create_user(
+            username='bob',
+            email='bob@example.com',
+            password='dog'
+        )
+        self.token = Token(user=self.user)
+        self.token.generate()
+        self.token.save()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token.access_token}')
+
+    def test_verify_without_database(self):
+        self.assertEqual(verify_token(self.token.access_token), self.user)
+
+        with self.assertNumQueries(0):
+            user = verify_token(self.token.access_token)
+        self.assertEqual(user.username, 'bob')
+
+    def test_forged_token(self):
+        payload, signature = self.token.access_token.rsplit(':', 1)
+        forged = Token(user=User.objects.create_user(username='alice', password='cat'))
+        forged.generate()
+
+        self.assertIsNone(verify_token(f'{forged.access_token.rsplit(":", 1)[0]}:{signature}'))
+        self.assertIsNone(verify_token(f'{payload}:{signature[::-1]}'))
+
+    def test_revoked_token_denied(self):
+        resp = self.client.get('/users/me/')
+        self.assertEqual(resp.status_code, 200)
+
+        resp = self.client.delete('/tokens/', data={'refresh_token': self.token.refresh_token})
+        self.assertEqual(resp.status_code, 204)
+
+        resp = self.client.get('/users/me/')
+        self.assertEqual(resp.status_code, 403)
+
+        other_worker = DenyList()
+        other_worker.sync()
+        self.assertIn(self.token.access_token_hash, other_worker)
+
+
+class ThrottlingTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        empty_buckets.clear()
+        local_counts.clear()
+        self.addCleanup(empty_buckets.clear)
+        User.objects.create_user(username='bob', email='bob@example.com', password='dog')
+
+    def login(self, password):
+        credentials = base64.b64encode(f'bob:{password}'.encode('utf-8')).decode('ascii')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Basic {credentials}')
+        return self.client.post('/tokens/')
+
+    @override_settings(REST_FRAMEWORK={'DEFAULT_THROTTLE_RATES': {'tokens.username': '2/min'}})
+    def test_login_throttled_before_authentication(self):
+        self.assertEqual(self.login('cat').status_code, 401)
+        self.assertEqual(self.login('cat').status_code, 401)
+
+        with self.assertNumQueries(0):
+            resp = self.login('dog')
+        self.assertEqual(resp.status_code, 429)
+        self.assertGreater(int(resp['Retry-After']), 0)
+
+    @override_settings(REST_FRAMEWORK={'DEFAULT_THROTTLE_RATES': {'tokens.username': '1/min'}})
+    def test_empty_bucket_rejects_without_shared_cache(self):
+        self.login('cat')
+        self.assertEqual(self.login('cat').status_code, 429)
+
+        # bucket and counters are gone from shared cache, worker still knows bucket is empty
+        cache.clear()
+        self.assertEqual(self.login('cat').status_code, 429)
+        self.assertIsNone(cache.get(counter_key(THROTTLE_REJECTED)))
+        self.assertEqual(local_counts[THROTTLE_REJECTED], 2)
+
+    def test_concurrent_requests_never_exceed_capacity(self):
+        barrier = Barrier(20)
+
+        def request(_):
+            barrier.wait()
+            return take_token('throttle:test', 5, 60)
+
+        with ThreadPoolExecutor(20) as executor:
+            waits = list(executor.map(request, range(20)))
+        self.assertEqual(waits.count(0), 5)
+
+    @override_settings(REST_FRAMEWORK={'DEFAULT_THROTTLE_RATES': {'tokens.ip': '1/min'}})
+    def test_ip_bucket_ignores_forwarded_for(self):
+        self.client.post('/tokens/', HTTP_X_FORWARDED_FOR='10.0.0.1')
+        resp = self.client.post('/tokens/', HTTP_X_FORWARDED_FOR='10.0.0.2')
+        self.assertEqual(resp.status_code, 429)
+
+    @override_settings(REST_FRAMEWORK={'DEFAULT_THROTTLE_RATES': {'posts.user': '1/min'}})
+    def test_post_creation_throttled(self):
+        resp = self.login('dog')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {resp.data["access_token"]}')
+
+        resp = self.client.post('/posts/', {'title': 'Title', 'content': 'Content'})
+        self.assertEqual(resp.status_code, 201)
+        resp = self.client.post('/posts/', {'title': 'Title', 'content': 'Content'})
+        self.assertEqual(resp.status_code, 429)
+        resp = self.client.get('/posts/')
+        self.assertEqual(resp.status_code, 200)
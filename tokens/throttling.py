@@ -0,0 +1,141 @@
+import base64
+import binascii
+from hashlib import sha1
+from math import ceil
+from time import monotonic, time
+from typing import Optional
+
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from metrics.utils import counter, increment
+from .cache import LocalCache
+
+THROTTLE_REJECTED = counter('throttle.rejected')
+
+# buckets known to be empty, lets worker reject repeated requests without shared cache round trip
+empty_buckets = LocalCache(10000)
+
+
+def parse_rate(rate: str) -> tuple:
+    """Parse 'capacity/period' rate into bucket capacity and refill period in seconds."""
+    capacity, period = rate.split('/')
+    return int(capacity), {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[period[0]]
+
+
+def count_request(key: str, timeout: int) -> int:
+    """Atomically increment shared window counter, returns count including current request."""
+    try:
+        return cache.incr(key)
+    except ValueError:
+        if cache.add(key, 1, timeout=timeout):
+            return 1
+        return cache.incr(key)
+
+
+def take_token(key: str, capacity: int, period: int) -> float:
+    """Take token from shared bucket, returns seconds to wait when bucket is empty.
+
+    Bucket is approximated by sliding window over atomic per-window counters, so
+    concurrent workers never let more than capacity requests through.
+    """
+    wait = empty_buckets.get(key)
+    if wait is not None:
+        return max(wait - monotonic(), 0)
+
+    now = time()
+    window, elapsed = divmod(now, period)
+    current_key = f'{key}:{int(window)}'
+    count = count_request(current_key, 2 * period)
+    previous = cache.get(f'{key}:{int(window) - 1}', 0)
+    if previous * (1 - elapsed / period) + count <= capacity:
+        return 0
+
+    # rejected request doesn't use up capacity
+    cache.decr(current_key)
+    room = capacity - count
+    if previous and room >= 0:
+        wait = period * (1 - room / previous) - elapsed
+    else:
+        wait = period - elapsed
+    empty_buckets.set(key, monotonic() + wait, wait)
+    return wait
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Token bucket limiting unsafe requests of single client.
+
+    Rate is looked up in DEFAULT_THROTTLE_RATES under '<view.throttle_scope>.<kind>'.
+    """
+    kind = None
+
+    def get_key(self, request: Request) -> Optional[str]:
+        """Get identity of client bucket belongs to, None skips throttling."""
+        raise NotImplementedError
+
+    def allow_request(self, request: Request, view) -> bool:
+        self.delay = 0
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(f'{getattr(view, "throttle_scope", None)}.{self.kind}')
+        if rate is None or request.method in SAFE_METHODS:
+            return True
+        ident = self.get_key(request)
+        if ident is None:
+            return True
+
+        key = f'throttle:{view.throttle_scope}.{self.kind}:{sha1(ident.encode("utf-8")).hexdigest()}'
+        self.delay = take_token(key, *parse_rate(rate))
+        if self.delay:
+            increment(THROTTLE_REJECTED)
+        return not self.delay
+
+    def wait(self) -> Optional[float]:
+        return ceil(self.delay)
+
+
+class IPThrottle(TokenBucketThrottle):
+    """Limit requests per client address.
+
+    X-Forwarded-For is trusted only when NUM_PROXIES count of trusted proxies is configured.
+    """
+    kind = 'ip'
+
+    def get_key(self, request: Request) -> Optional[str]:
+        if api_settings.NUM_PROXIES is None:
+            return request.META.get('REMOTE_ADDR')
+        return self.get_ident(request)
+
+
+class UsernameThrottle(TokenBucketThrottle):
+    """Limit login attempts per username sent in Basic authorization header."""
+    kind = 'username'
+
+    def get_key(self, request: Request) -> Optional[str]:
+        auth = request.META.get('HTTP_AUTHORIZATION', '').split()
+        if len(auth) != 2 or auth[0].lower() != 'basic':
+            return None
+        try:
+            return base64.b64decode(auth[1]).decode('utf-8').partition(':')[0]
+        except (binascii.Error, UnicodeDecodeError):
+            return None
+
+
+class UserThrottle(TokenBucketThrottle):
+    """Limit requests per authenticated user."""
+    kind = 'user'
+
+    def get_key(self, request: Request) -> Optional[str]:
+        return str(request.user.pk) if request.user.is_authenticated else None
+
+
+class ThrottleBeforeAuthenticationMixin:
+    """Check throttles before authentication, rejected requests never reach password hasher."""
+
+    def perform_authentication(self, request: Request):
+        super().check_throttles(request)
+        super().perform_authentication(request)
+
+    def check_throttles(self, request: Request):
+        """Throttles are already checked before authentication."""
@@ -5,8 +5,10 @@ from rest_framework import status
 from rest_framework.request import Request
 from rest_framework.response import Response
 
+from .cache import evict_tokens
+from .stateless import deny_list
 from .errors import unauthorized
-from .models import Token 
+from .models import Token, hash_token
 
 
 def create_token(request: Request):
@@ -15,8 +17,6 @@ def create_token(request: Request):
     token.generate()
     token.save()
 
-    Token.clean()
-
     return token_response(token)
 
 
@@ -31,6 +31,10 @@ def refresh_token(request: Request):
         return unauthorized()
 
     token.expire()
+    token.save()
+    evict_tokens(token.access_token_hash)
+    if settings.STATELESS_ACCESS_TOKENS:
+        deny_list.add(token.access_token_hash)
     new_token = Token(user=token.user)
     new_token.generate()
     new_token.save()
@@ -50,6 +54,9 @@ def revoke_token(request: Request):
 
     token.expire()
     token.save()
+    evict_tokens(token.access_token_hash)
+    if settings.STATELESS_ACCESS_TOKENS:
+        deny_list.add(token.access_token_hash)
 
     response = Response(status=status.HTTP_204_NO_CONTENT)
     response.delete_cookie('refresh_token')
@@ -82,6 +89,6 @@ def get_refresh_token(request: Request):
 
 def verify_token(token: str):
     """Verify if token is valid."""
-    token = Token.objects.filter(refresh_token=token).first()
+    token = Token.objects.select_related('user').filter(refresh_token_hash=hash_token(token)).first()
     if token is not None and token.refresh_expiration > datetime.now(tz=timezone.utc):
         return token 
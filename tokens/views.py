@@ -6,11 +6,14 @@ from rest_framework.authentication import BasicAuthentication
 from .utils import create_token, refresh_token, revoke_token
 from .permissions import IsAutenticatedForCreate
 from .serializers import TokenSerializer
+from .throttling import IPThrottle, ThrottleBeforeAuthenticationMixin, UsernameThrottle
 
 
-class TokenView(APIView):
+class TokenView(ThrottleBeforeAuthenticationMixin, APIView):
     permission_classes = [IsAutenticatedForCreate]
     authentication_classes = [BasicAuthentication]
+    throttle_classes = [IPThrottle, UsernameThrottle]
+    throttle_scope = 'tokens'
 
     @extend_schema(summary='Create new access token', tags=['Tokens'])
     def post(self, request: Request):
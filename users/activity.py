@@ -0,0 +1,119 @@
+import atexit
+import logging
+from datetime import datetime
+from threading import Event, Lock, Thread
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, connection
+from django.db.models import Case, DateTimeField, Value, When
+from django.db.models.functions import Greatest
+
+from metrics.utils import counter, flush_counters, increment
+from .cache import invalidate_users
+
+logger = logging.getLogger(__name__)
+
+LAST_SEEN_BUFFERED = counter('last_seen.buffered')
+LAST_SEEN_FLUSHED = counter('last_seen.flushed')
+
+# largest number of users written by single UPDATE statement
+FLUSH_BATCH_SIZE = 500
+
+pending = {}
+pending_lock = Lock()
+# wakes background flusher before interval passes when batch is full
+flush_requested = Event()
+flusher = None
+flusher_lock = Lock()
+
+
+def record_last_seen(pk: int, seen: datetime, previous: datetime = None):
+    """Buffer user last seen time, values within resolution of previous one are dropped."""
+    if flusher is None:
+        start_flusher()
+    resolution = settings.LAST_SEEN_RESOLUTION
+    with pending_lock:
+        previous = pending.get(pk, previous)
+        if previous is not None and (seen - previous).total_seconds() < resolution:
+            return
+        pending[pk] = seen
+        due = len(pending) >= FLUSH_BATCH_SIZE or settings.LAST_SEEN_FLUSH_INTERVAL <= 0
+    increment(LAST_SEEN_BUFFERED)
+    if due and flusher is not None:
+        flush_requested.set()
+    elif due:
+        # background flushing is disabled, write right away
+        flush_last_seen()
+
+
+def take_pending() -> dict:
+    """Remove and return all buffered last seen times."""
+    with pending_lock:
+        batch = dict(pending)
+        pending.clear()
+    return batch
+
+
+def flush_last_seen() -> int:
+    """Write buffered last seen times using single UPDATE per batch."""
+    batch = take_pending()
+    if not batch:
+        return 0
+
+    User = get_user_model()
+    items = list(batch.items())
+    for start in range(0, len(items), FLUSH_BATCH_SIZE):
+        chunk = items[start:start + FLUSH_BATCH_SIZE]
+        seen = Case(
+            *[When(pk=pk, then=Value(value)) for pk, value in chunk],
+            output_field=DateTimeField()
+        )
+        # other workers may have flushed newer value already, never move last seen backwards
+        User.objects.filter(pk__in=[pk for pk, _ in chunk]).update(last_seen=Greatest('last_seen', seen))
+    invalidate_users(*batch)
+    increment(LAST_SEEN_FLUSHED, len(batch))
+    return len(batch)
+
+
+def flush_periodically(interval: int):
+    """Flush buffered last seen times and metrics every interval seconds or as soon as batch fills up."""
+    while True:
+        flush_requested.wait(interval)
+        flush_requested.clear()
+        try:
+            flush_last_seen()
+        except DatabaseError:
+            logger.exception('Failed to flush buffered last seen times')
+        finally:
+            connection.close()
+        try:
+            flush_counters()
+        except Exception:
+            logger.exception('Failed to flush metrics')
+
+
+def start_flusher():
+    """Start background last seen flusher in current process when LAST_SEEN_FLUSH_INTERVAL is set.
+
+    Started lazily by first buffered write, so servers, autoreloaded runserver and management commands all flush.
+    """
+    global flusher
+    if settings.LAST_SEEN_FLUSH_INTERVAL <= 0:
+        return
+    with flusher_lock:
+        if flusher is None:
+            flusher = Thread(
+                target=flush_periodically, args=(settings.LAST_SEEN_FLUSH_INTERVAL,), name='last-seen-flusher',
+                daemon=True
+            )
+            flusher.start()
+            atexit.register(flush_on_exit)
+
+
+def flush_on_exit():
+    """Flush buffered last seen times when worker shuts down."""
+    try:
+        flush_last_seen()
+    except DatabaseError:
+        logger.exception('Failed to flush buffered last seen times')
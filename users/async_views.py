@@ -0,0 +1,83 @@
+from functools import wraps
+from inspect import iscoroutine, iscoroutinefunction
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework import exceptions
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.request import Request
+from rest_framework.views import APIView
+
+
+def run_in_thread(handler):
+    """Turn sync view handler into coroutine running it in worker thread."""
+    @wraps(handler)
+    async def run(self, *args, **kwargs):
+        return await sync_to_async(handler)(self, *args, **kwargs)
+    return run
+
+
+def variant(view, async_view):
+    """Pick view matching deployment mode configured with ASYNC_VIEWS setting."""
+    return async_view if settings.ASYNC_VIEWS else view
+
+
+class AsyncAPIView(APIView):
+    """APIView with coroutine handlers served without blocking event loop.
+
+    Handlers inherited as regular functions, usually writes, run in worker
+    thread. Authentication classes providing 'aauthenticate' coroutine are
+    awaited, others run in worker thread as well.
+    """
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for method in cls.http_method_names:
+            handler = getattr(cls, method, None)
+            if method != 'options' and handler is not None and not iscoroutinefunction(handler):
+                setattr(cls, method, run_in_thread(handler))
+
+    async def perform_async_authentication(self, request: Request):
+        """Authenticate request before regular initial checks run."""
+        for authenticator in request.authenticators:
+            authenticate = getattr(authenticator, 'aauthenticate', None) or sync_to_async(authenticator.authenticate)
+            try:
+                user_auth_tuple = await authenticate(request)
+            except exceptions.APIException:
+                request._not_authenticated()
+                raise
+
+            if user_auth_tuple is not None:
+                request._authenticator = authenticator
+                request.user, request.auth = user_auth_tuple
+                return
+        request._not_authenticated()
+
+    async def dispatch(self, request, *args, **kwargs):
+        """Same as APIView.dispatch but awaiting authentication and handler."""
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await self.perform_async_authentication(request)
+            if request.method in SAFE_METHODS:
+                self.initial(request, *args, **kwargs)
+            else:
+                # throttles of unsafe requests use shared cache
+                await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+            if iscoroutine(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
@@ -0,0 +1,134 @@
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from metrics.utils import counter, increment
+
+PAYLOAD_CACHE_VERSION = 1
+
+USER_CACHE_HITS = counter('payload_cache.user.hits')
+USER_CACHE_MISSES = counter('payload_cache.user.misses')
+
+# recent follow checks counted per worker, cold users never pay shared cache round trip for counting
+FOLLOW_CHECKS_SIZE = 10000
+follow_checks = OrderedDict()
+follow_checks_lock = Lock()
+
+
+def user_key(pk: int) -> str:
+    """Cache key of serialized user."""
+    return f'payload:user:{pk}'
+
+
+def username_key(username: str) -> str:
+    """Cache key mapping username to user id."""
+    return f'payload:username:{username}'
+
+
+def get_user_entry(pk: int) -> Optional[dict]:
+    """Retrieve cached serialized user by id."""
+    entry = cache.get(user_key(pk), version=PAYLOAD_CACHE_VERSION)
+    increment(USER_CACHE_HITS if entry is not None else USER_CACHE_MISSES)
+    return entry
+
+
+async def aget_user_entry(pk: int) -> Optional[dict]:
+    """Retrieve cached serialized user by id without blocking event loop."""
+    entry = await cache.aget(user_key(pk), version=PAYLOAD_CACHE_VERSION)
+    increment(USER_CACHE_HITS if entry is not None else USER_CACHE_MISSES)
+    return entry
+
+
+def username_entry(username: str, entry: Optional[dict]) -> Optional[dict]:
+    """Count lookup of user by username, username mapping may outlive rename of the user."""
+    if entry is not None and entry['data']['username'] != username:
+        entry = None
+    increment(USER_CACHE_HITS if entry is not None else USER_CACHE_MISSES)
+    return entry
+
+
+def get_user_entry_by_username(username: str) -> Optional[dict]:
+    """Retrieve cached serialized user by username."""
+    pk = cache.get(username_key(username), version=PAYLOAD_CACHE_VERSION)
+    entry = cache.get(user_key(pk), version=PAYLOAD_CACHE_VERSION) if pk is not None else None
+    return username_entry(username, entry)
+
+
+async def aget_user_entry_by_username(username: str) -> Optional[dict]:
+    """Retrieve cached serialized user by username without blocking event loop."""
+    pk = await cache.aget(username_key(username), version=PAYLOAD_CACHE_VERSION)
+    entry = await cache.aget(user_key(pk), version=PAYLOAD_CACHE_VERSION) if pk is not None else None
+    return username_entry(username, entry)
+
+
+def user_entries(user, data: dict) -> dict:
+    """Build cache entries of serialized user and its username mapping."""
+    return {
+        user_key(user.pk): {'data': data, 'last_modified': user.last_modified},
+        username_key(user.username): user.pk,
+    }
+
+
+def set_user_entry(user, data: dict) -> dict:
+    """Cache serialized user."""
+    entries = user_entries(user, data)
+    cache.set_many(entries, timeout=settings.PAYLOAD_CACHE_TIMEOUT, version=PAYLOAD_CACHE_VERSION)
+    return entries[user_key(user.pk)]
+
+
+async def aset_user_entry(user, data: dict) -> dict:
+    """Cache serialized user without blocking event loop."""
+    entries = user_entries(user, data)
+    await cache.aset_many(entries, timeout=settings.PAYLOAD_CACHE_TIMEOUT, version=PAYLOAD_CACHE_VERSION)
+    return entries[user_key(user.pk)]
+
+
+def invalidate_users(*pks: int):
+    """Drop cached serialized users."""
+    cache.delete_many([user_key(pk) for pk in pks], version=PAYLOAD_CACHE_VERSION)
+
+
+FOLLOW_SET_HITS = counter('follow_set.hits')
+FOLLOW_SET_MISSES = counter('follow_set.misses')
+
+# marks follow set too large to be cached, never valid array of 8 byte ids
+FOLLOW_SET_TOO_LARGE = b'-'
+
+
+def follow_set_key(pk: int) -> str:
+    """Cache key of ids followed by user."""
+    return f'follows:set:{pk}'
+
+
+def get_follow_set(pk: int) -> Optional[bytes]:
+    """Retrieve cached sorted array of ids followed by user."""
+    follow_set = cache.get(follow_set_key(pk), version=PAYLOAD_CACHE_VERSION)
+    increment(FOLLOW_SET_HITS if follow_set is not None else FOLLOW_SET_MISSES)
+    return follow_set
+
+
+def set_follow_set(pk: int, follow_set: bytes):
+    """Cache sorted array of ids followed by user."""
+    cache.set(follow_set_key(pk), follow_set, timeout=settings.FOLLOW_SET_TIMEOUT, version=PAYLOAD_CACHE_VERSION)
+
+
+def record_follow_check(pk: int) -> int:
+    """Count follow check of user in process, returns number of checks within current window."""
+    now = monotonic()
+    with follow_checks_lock:
+        count, expires = follow_checks.pop(pk, (0, 0))
+        if expires <= now:
+            count, expires = 0, now + settings.FOLLOW_SET_TIMEOUT
+        follow_checks[pk] = (count + 1, expires)
+        if len(follow_checks) > FOLLOW_CHECKS_SIZE:
+            follow_checks.popitem(last=False)
+    return count + 1
+
+
+def invalidate_follow_sets(*pks: int):
+    """Drop cached follow sets."""
+    cache.delete_many([follow_set_key(pk) for pk in pks], version=PAYLOAD_CACHE_VERSION)
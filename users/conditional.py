@@ -0,0 +1,46 @@
+from datetime import datetime
+from hashlib import sha1
+from typing import Iterable, Optional
+
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework.request import Request
+
+
+def make_etag(*parts) -> str:
+    """Build strong entity tag from representation version parts."""
+    digest = sha1(repr(parts).encode('utf-8')).hexdigest()
+    return f'"{digest}"'
+
+
+def validators(request: Request, rows: Iterable):
+    """Compute ETag and Last-Modified of response rendering given rows.
+
+    Rows must provide 'last_modified' timestamp covering all data they render.
+    """
+    return version_validators(request, [(type(row).__name__, row.pk, row.last_modified) for row in rows])
+
+
+def version_validators(request: Request, versions: list):
+    """Compute ETag and Last-Modified from (model name, pk, last_modified) versions."""
+    etag = make_etag(request.get_full_path(), request.META.get('HTTP_ACCEPT'), versions)
+    last_modified = max((version[2] for version in versions), default=None)
+    return etag, last_modified
+
+
+def not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> Optional[HttpResponse]:
+    """Return 304 response if client copy of representation is still fresh."""
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None:
+        return with_validators(response, etag, last_modified)
+
+
+def with_validators(response: HttpResponse, etag: str, last_modified: Optional[datetime]) -> HttpResponse:
+    """Attach ETag and Last-Modified headers to response, validators depend on negotiated renderer."""
+    response['ETag'] = etag
+    patch_vary_headers(response, ['Accept'])
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
@@ -0,0 +1,77 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from statistics import quantiles
+
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework.test import APIRequestFactory
+
+from posts.views import AsyncPostList, PostList
+
+
+class Command(BaseCommand):
+    help = 'Compare sync and async post list views serving concurrent requests with slow database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Number of requests sent.')
+        parser.add_argument('--workers', type=int, default=4, help='Number of sync workers.')
+        parser.add_argument('--concurrency', type=int, default=50, help='Number of requests async view serves at once.')
+        parser.add_argument('--db-latency', type=float, default=50, help='Delay added to every query in milliseconds.')
+
+    def handle(self, *args, **options):
+        latency = options['db_latency'] / 1000
+
+        def slow_query(execute, sql, params, many, context):
+            time.sleep(latency)
+            return execute(sql, params, many, context)
+
+        def add_latency(connection, **kwargs):
+            if slow_query not in connection.execute_wrappers:
+                connection.execute_wrappers.append(slow_query)
+
+        connection_created.connect(add_latency)
+        for connection in connections.all():
+            if connection.connection is not None:
+                add_latency(connection)
+
+        factory = APIRequestFactory()
+        view, async_view = PostList.as_view(), AsyncPostList.as_view()
+
+        def sync_request():
+            start = time.perf_counter()
+            view(factory.get('/posts/')).render()
+            connections.close_all()
+            return time.perf_counter() - start
+
+        async def async_request(slots: asyncio.Semaphore):
+            async with slots:
+                start = time.perf_counter()
+                async with ThreadSensitiveContext():
+                    response = await async_view(factory.get('/posts/'))
+                    await sync_to_async(connections.close_all)()
+                response.render()
+                return time.perf_counter() - start
+
+        async def async_run():
+            slots = asyncio.Semaphore(options['concurrency'])
+            return await asyncio.gather(*(async_request(slots) for _ in range(options['requests'])))
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            timings = list(pool.map(lambda _: sync_request(), range(options['requests'])))
+        self.report(f'sync, {options["workers"]} workers', timings, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        timings = asyncio.run(async_run())
+        self.report(f'async, {options["concurrency"]} concurrent', timings, time.perf_counter() - start)
+
+    def report(self, name: str, timings: list, elapsed: float):
+        """Print throughput and latency percentiles."""
+        percentiles = quantiles(timings, n=100)
+        self.stdout.write(
+            f'{name}: {len(timings) / elapsed:.1f} req/s, '
+            f'p50 {percentiles[49] * 1000:.0f} ms, p95 {percentiles[94] * 1000:.0f} ms'
+        )
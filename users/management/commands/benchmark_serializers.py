@@ -0,0 +1,59 @@
+from timeit import default_timer
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from posts.models import Post
+from posts.serializers import PostSerializer
+from users.renderers import ORJSONRenderer
+from users.serializers import UserSerializer
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Compare per item cost of serializer and .values() read paths on existing rows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100, help='Number of rows rendered at once.')
+        parser.add_argument('--repeat', type=int, default=20, help='Number of measured runs.')
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        targets = [
+            ('posts', PostSerializer, Post.objects.select_related('author').order_by('-created_at', '-id')),
+            ('users', UserSerializer, User.objects.order_by('id')),
+        ]
+
+        for name, serializer_class, query in targets:
+            def serializer_path():
+                data = serializer_class(list(query[:rows]), many=True).data
+                return JSONRenderer().render(data)
+
+            def values_path():
+                data = serializer_class.render_values(list(serializer_class.values_queryset(query, None, ())[:rows]))
+                return ORJSONRenderer().render(data)
+
+            count = query[:rows].count()
+            if not count:
+                self.stdout.write(f'{name}: no rows to render')
+                continue
+
+            before = self.measure(serializer_path, repeat) / count
+            after = self.measure(values_path, repeat) / count
+            self.stdout.write(
+                f'{name}: {count} rows, serializer {before * 1e6:.1f} us/item, '
+                f'values {after * 1e6:.1f} us/item, {before / after:.1f}x faster'
+            )
+
+    @staticmethod
+    def measure(path, repeat: int) -> float:
+        """Best run time of path in seconds."""
+        path()
+        timings = []
+        for _ in range(repeat):
+            start = default_timer()
+            path()
+            timings.append(default_timer() - start)
+        return min(timings)
@@ -0,0 +1,28 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from users.utils import recount_users
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Repair drifted post, follower and following counters of users.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of users checked at once.')
+
+    def handle(self, *args, **options):
+        last_pk, checked, repaired = 0, 0, 0
+        while True:
+            pks = list(
+                User.objects.filter(pk__gt=last_pk).order_by('pk')
+                .values_list('pk', flat=True)[:options['batch_size']]
+            )
+            if not pks:
+                break
+            repaired += recount_users(pks)
+            checked += len(pks)
+            last_pk = pks[-1]
+
+        self.stdout.write(f'Checked {checked} users, repaired {repaired}.')
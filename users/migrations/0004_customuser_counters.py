@@ -0,0 +1,49 @@
+# Generated by Django 4.1.3 on 2026-10-18 18:26
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_related(model, field):
+    rows = model.objects.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(n=Count('pk'))
+    return Coalesce(Subquery(rows.values('n')), 0)
+
+
+def count_existing(apps, schema_editor):
+    CustomUser = apps.get_model('users', 'CustomUser')
+    Post = apps.get_model('posts', 'Post')
+    Follow = CustomUser.following.through
+
+    CustomUser.objects.update(
+        post_count=count_related(Post, 'author'),
+        follower_count=count_related(Follow, 'to_customuser'),
+        following_count=count_related(Follow, 'from_customuser'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_customuser_updated_at'),
+        ('posts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='follower_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='post_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_existing, migrations.RunPython.noop),
+    ]
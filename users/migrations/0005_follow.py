@@ -0,0 +1,86 @@
+from django.conf import settings
+from django.contrib.postgres import operations
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class AddCreatedAt(migrations.AddField):
+    """Add creation time with database default on postgres in single statement.
+
+    Processes running previous release keep inserting follows without creation time while release rolls out.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            schema_editor.execute(
+                'ALTER TABLE users_customuser_following '
+                'ADD COLUMN created_at timestamp with time zone DEFAULT now() NOT NULL'
+            )
+        else:
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+
+class AddIndexConcurrently(operations.AddIndexConcurrently):
+    """Build index without locking follows table for writes on postgres, plain index elsewhere."""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+        else:
+            migrations.AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+        else:
+            migrations.AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+    # concurrent index builds can't run inside transaction
+    atomic = False
+
+    dependencies = [
+        ('users', '0004_customuser_counters'),
+    ]
+
+    operations = [
+        # adopt existing many-to-many table, database stays untouched
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='Follow',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('follower', models.ForeignKey(db_column='from_customuser_id', on_delete=django.db.models.deletion.CASCADE, related_name='following_edges', to=settings.AUTH_USER_MODEL)),
+                        ('followed', models.ForeignKey(db_column='to_customuser_id', on_delete=django.db.models.deletion.CASCADE, related_name='follower_edges', to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'db_table': 'users_customuser_following',
+                        'unique_together': {('follower', 'followed')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='customuser',
+                    name='following',
+                    field=models.ManyToManyField(blank=True, related_name='followers', through='users.Follow', through_fields=('follower', 'followed'), to=settings.AUTH_USER_MODEL),
+                ),
+            ],
+            database_operations=[],
+        ),
+        # existing follows get migration time as their creation time
+        AddCreatedAt(
+            model_name='follow',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        AddIndexConcurrently(
+            model_name='follow',
+            index=models.Index(fields=['followed', 'created_at', 'id'], name='follow_followed_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='follow',
+            index=models.Index(fields=['follower', 'created_at', 'id'], name='follow_follower_created_idx'),
+        ),
+    ]
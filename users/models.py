@@ -1,8 +1,24 @@
+from array import array
+from bisect import bisect_left
 from hashlib import md5
 from datetime import datetime, timezone
 
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest, Now
+from django.utils.timezone import now
+
+from django_project.routers import primary_reads
+from .activity import record_last_seen
+from .cache import FOLLOW_SET_TOO_LARGE, get_follow_set, invalidate_follow_sets, record_follow_check, set_follow_set
+
+
+def gravatar_url(email: str) -> str:
+    """Get avatar url of email."""
+    hash = md5(email.encode('utf-8')).hexdigest()
+    return f'https://www.gravatar.com/avatar/{hash}'
 
 
 class CustomUser(AbstractUser):
@@ -10,34 +26,168 @@ class CustomUser(AbstractUser):
     about_me = models.CharField(max_length=128, default='')
     last_seen = models.DateTimeField(auto_now_add=True)
     member_since = models.DateTimeField(auto_now_add=True)
-    following = models.ManyToManyField('CustomUser', blank=True, related_name='followers')
+    updated_at = models.DateTimeField(auto_now=True)
+    following = models.ManyToManyField(
+        'CustomUser', blank=True, related_name='followers', through='Follow', through_fields=('follower', 'followed')
+    )
+    post_count = models.PositiveIntegerField(default=0)
+    follower_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
+    COUNTER_FIELDS = ('post_count', 'follower_count', 'following_count')
 
     @property
     def avatar_url(self):
         """Get user avatar url."""
-        hash = md5(self.email.encode('utf-8')).hexdigest()
-        return f'https://www.gravatar.com/avatar/{hash}'
+        return gravatar_url(self.email)
+
+    @property
+    def last_modified(self):
+        """Get time user public information was last changed."""
+        return max(self.updated_at, self.last_seen)
+
+    def save(self, *args, **kwargs):
+        """Save user, counters are only written when explicitly listed in update_fields."""
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def adjust_counters(*pks: int, **deltas: int):
+        """Atomically change denormalized counters of users in single statement."""
+        CustomUser.objects.filter(pk__in=pks).update(
+            updated_at=Now(),
+            **{name: Greatest(F(name) + delta, 0) for name, delta in deltas.items()}
+        )
 
     def ping(self):
-        """Update users last seen."""
-        self.last_seen = datetime.now(tz=timezone.utc)
-        self.save()
+        """Update users last seen, write is buffered and flushed in batches."""
+        previous, self.last_seen = self.last_seen, datetime.now(tz=timezone.utc)
+        record_last_seen(self.pk, self.last_seen, previous)
+
+    def load_follow_set(self) -> bytes:
+        """Read sorted array of followed user ids from primary database and cache it."""
+        with primary_reads():
+            ids = list(
+                Follow.objects.filter(follower_id=self.pk)
+                .order_by('followed_id').values_list('followed_id', flat=True)
+                [:settings.FOLLOW_SET_MAX_SIZE + 1]
+            )
+        follow_set = array('q', ids).tobytes() if len(ids) <= settings.FOLLOW_SET_MAX_SIZE else FOLLOW_SET_TOO_LARGE
+        set_follow_set(self.pk, follow_set)
+        return follow_set
 
     def is_following(self, user: 'CustomUser'):
         """Check if user is followed by current user."""
-        return user in self.following.all()
+        return self.is_following_id(user.pk)
+
+    def is_following_id(self, pk: int) -> bool:
+        """Check if user with given id is followed by current user."""
+        follow_set = get_follow_set(self.pk)
+        if follow_set is None and record_follow_check(self.pk) >= settings.FOLLOW_SET_HOT_THRESHOLD:
+            follow_set = self.load_follow_set()
+
+        if follow_set is not None and follow_set != FOLLOW_SET_TOO_LARGE:
+            ids = array('q')
+            ids.frombytes(follow_set)
+            index = bisect_left(ids, pk)
+            return index < len(ids) and ids[index] == pk
+        return Follow.objects.filter(follower_id=self.pk, followed_id=pk).exists()
 
     def is_followed_by(self, user: "CustomUser"):
         """Check if user is current user follower."""
-        return user in self.followers.all()
+        return user.is_following(self)
+
+    def follow(self, user: 'CustomUser') -> bool:
+        """Follow user, returns False if user is already followed."""
+        with transaction.atomic():
+            self.lock_row()
+            _, created = Follow.objects.get_or_create(follower_id=self.pk, followed_id=user.pk)
+            if created:
+                CustomUser.adjust_counters(self.pk, following_count=1)
+                CustomUser.adjust_counters(user.pk, follower_count=1)
+                self.invalidate_follow_set()
+        return created
+
+    def unfollow(self, user: 'CustomUser') -> bool:
+        """Unfollow user, returns False if user wasn't followed."""
+        with transaction.atomic():
+            self.lock_row()
+            deleted, _ = Follow.objects.filter(follower_id=self.pk, followed_id=user.pk).delete()
+            if deleted:
+                CustomUser.adjust_counters(self.pk, following_count=-1)
+                CustomUser.adjust_counters(user.pk, follower_count=-1)
+                self.invalidate_follow_set()
+        return bool(deleted)
+
+    def follow_many(self, pks: set) -> list:
+        """Follow many users with single insert, returns sorted ids of users that weren't followed yet."""
+        with transaction.atomic():
+            self.lock_row()
+            followed = set(
+                Follow.objects.filter(follower_id=self.pk, followed_id__in=pks).values_list('followed_id', flat=True)
+            )
+            created = sorted(pks - followed)
+            if created:
+                Follow.objects.bulk_create(
+                    [Follow(follower_id=self.pk, followed_id=pk) for pk in created], ignore_conflicts=True
+                )
+                CustomUser.adjust_counters(self.pk, following_count=len(created))
+                CustomUser.adjust_counters(*created, follower_count=1)
+                self.invalidate_follow_set()
+        return created
+
+    def unfollow_many(self, pks: set) -> list:
+        """Unfollow many users with single delete, returns sorted ids of users that were followed."""
+        with transaction.atomic():
+            self.lock_row()
+            edges = Follow.objects.select_for_update().filter(follower_id=self.pk, followed_id__in=pks)
+            deleted = sorted(edges.values_list('followed_id', flat=True))
+            if deleted:
+                Follow.objects.filter(follower_id=self.pk, followed_id__in=deleted).delete()
+                CustomUser.adjust_counters(self.pk, following_count=-len(deleted))
+                CustomUser.adjust_counters(*deleted, follower_count=-1)
+                self.invalidate_follow_set()
+        return deleted
 
-    def follow(self, user: 'CustomUser'):
-        """Follow user."""
-        self.following.add(user) 
+    def lock_row(self):
+        """Lock user row until end of current transaction.
 
-    def unfollow(self, user: 'CustomUser'):
-        """Unfollow user."""
-        self.following.remove(user) 
+        Taken by every follow and unfollow of user, so concurrent changes to same edges never skew counters.
+        """
+        list(CustomUser.objects.select_for_update().filter(pk=self.pk).values_list('pk', flat=True))
+
+    def invalidate_follow_set(self):
+        """Drop cached follow set now and once again after commit, when concurrent readers see the change."""
+        invalidate_follow_sets(self.pk)
+        transaction.on_commit(lambda: invalidate_follow_sets(self.pk))
 
     def __str__(self):
         return self.username
+
+
+class Follow(models.Model):
+    """Django model to represent follow edges between users.
+
+    Table and columns are kept from implicit many-to-many table it replaced.
+    """
+    follower = models.ForeignKey(
+        CustomUser, on_delete=models.CASCADE, related_name='following_edges', db_column='from_customuser_id'
+    )
+    followed = models.ForeignKey(
+        CustomUser, on_delete=models.CASCADE, related_name='follower_edges', db_column='to_customuser_id'
+    )
+    created_at = models.DateTimeField(default=now)
+
+    class Meta:
+        db_table = 'users_customuser_following'
+        unique_together = [('follower', 'followed')]
+        indexes = [
+            models.Index(fields=['followed', 'created_at', 'id'], name='follow_followed_created_idx'),
+            models.Index(fields=['follower', 'created_at', 'id'], name='follow_follower_created_idx'),
+        ]
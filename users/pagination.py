@@ -0,0 +1,114 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from typing import Optional, Sequence, Union
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Model, Q, QuerySet
+
+
+class InvalidCursor(Exception):
+    """Raised when pagination cursor can't be decoded."""
+
+
+def ordering_fields(ordering: Sequence[str]):
+    """Strip direction prefixes from ordering."""
+    return [name.lstrip('-') for name in ordering]
+
+
+def cursor_value(obj: Union[Model, dict], name: str):
+    """Get JSON serializable ordering value of object or .values() row."""
+    if isinstance(obj, dict):
+        value = obj[name]
+        return value.isoformat() if isinstance(value, datetime) else value
+    try:
+        return obj._meta.get_field(name).value_to_string(obj)
+    except FieldDoesNotExist:
+        return getattr(obj, name)
+
+
+def parse_cursor_value(model: type, name: str, value):
+    """Convert cursor value back to python object."""
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        if not isinstance(value, (int, float, str)):
+            raise InvalidCursor
+        return value
+    return field.to_python(value)
+
+
+def encode_cursor(obj: Union[Model, dict], ordering: Sequence[str], direction: str) -> str:
+    """Build opaque cursor pointing at object position.
+
+    Ordering may reference model fields as well as queryset annotations.
+    """
+    values = [cursor_value(obj, name) for name in ordering_fields(ordering)]
+    payload = json.dumps({'d': direction, 'v': values}, separators=(',', ':'))
+    return urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, model: type, ordering: Sequence[str]):
+    """Decode opaque cursor into direction and ordering values."""
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        payload = json.loads(urlsafe_b64decode(cursor + padding))
+        direction, raw_values = payload['d'], payload['v']
+        names = ordering_fields(ordering)
+        if direction not in ('next', 'prev') or len(raw_values) != len(names):
+            raise InvalidCursor
+        values = [parse_cursor_value(model, name, value) for name, value in zip(names, raw_values)]
+    except (ValueError, TypeError, KeyError, ValidationError):
+        raise InvalidCursor
+    return direction, values
+
+
+def keyset_filter(ordering: Sequence[str], values: list, reverse: bool = False) -> Q:
+    """Build filter selecting rows located after values in given ordering."""
+    names = ordering_fields(ordering)
+    condition = Q()
+    for i, name in enumerate(names):
+        descending = ordering[i].startswith('-') != reverse
+        step = Q(**{f'{name}__{"lt" if descending else "gt"}': values[i]})
+        for prev_name, prev_value in zip(names[:i], values[:i]):
+            step &= Q(**{prev_name: prev_value})
+        condition |= step
+    return condition
+
+
+def reverse_ordering(ordering: Sequence[str]):
+    """Flip direction of every ordering field."""
+    return [name[1:] if name.startswith('-') else f'-{name}' for name in ordering]
+
+
+def cursor_page_query(query: QuerySet, ordering: Sequence[str], limit: int, cursor: Optional[str]):
+    """Build query fetching single page of rows using keyset pagination.
+
+    Returns query together with decoded cursor direction and values.
+    """
+    direction, values = 'next', None
+    if cursor:
+        direction, values = decode_cursor(cursor, query.model, ordering)
+
+    backwards = direction == 'prev'
+    page_ordering = reverse_ordering(ordering) if backwards else list(ordering)
+    if values is not None:
+        query = query.filter(keyset_filter(ordering, values, reverse=backwards))
+    return query.order_by(*page_ordering)[:limit + 1], direction, values
+
+
+def cursor_page(rows: list, ordering: Sequence[str], limit: int, direction: str, values: Optional[list]):
+    """Turn rows fetched by cursor page query into page with neighbour cursors."""
+    backwards = direction == 'prev'
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if backwards:
+        rows.reverse()
+
+    has_next = has_more if not backwards else values is not None
+    has_prev = has_more if backwards else values is not None
+    return {
+        'rows': rows,
+        'next': encode_cursor(rows[-1], ordering, 'next') if rows and has_next else None,
+        'prev': encode_cursor(rows[0], ordering, 'prev') if rows and has_prev else None,
+    }
@@ -0,0 +1,37 @@
+import msgpack
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSON renderer serializing response data with orjson.
+
+    Output matches default DRF renderer, indented output requested through
+    media type parameters is left to it.
+    """
+    options = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type or '', renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(data, default=JSONEncoder().default, option=self.options)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Renderer serializing response data into MessagePack.
+
+    Values without MessagePack type are converted the way JSON renderer does,
+    so both representations decode into same data.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=JSONEncoder().default, use_bin_type=True)
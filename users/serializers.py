@@ -1,9 +1,105 @@
+from functools import lru_cache
+from operator import itemgetter
+
 from rest_framework import serializers, validators
-from .models import CustomUser
+from .models import CustomUser, gravatar_url
+
+# fields rendered from .values() as is, JSON renderers format datetimes same way DateTimeField does
+PLAIN_FIELDS = (serializers.CharField, serializers.IntegerField, serializers.FloatField, serializers.DateTimeField)
+
+
+class SparseFieldsMixin:
+    """Serializer mixin rendering only fields requested by client.
+
+    'column_dependencies' maps serializer fields to model columns they are
+    rendered from, fields not listed there are rendered from column of same name.
+
+    Besides regular model instances serializer renders plain .values() rows
+    through 'render_values', 'value_converters' maps fields to functions
+    computing them from their column dependencies.
+    """
+    column_dependencies = {}
+    value_converters = {}
+    always_columns = ('id',)
+    last_modified_columns = ('updated_at',)
+    expandable_fields = ()
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def readable_fields(cls):
+        """Names of fields serializer can render."""
+        return [name for name, field in cls._declared_fields.items() if not field.write_only]
+
+    @classmethod
+    def columns(cls, fields=None, expand=(), prefix=''):
+        """Model columns needed to render given fields."""
+        columns = list(cls.always_columns)
+        for name in fields if fields is not None else cls.readable_fields():
+            columns.extend(cls.column_dependencies.get(name, (name,)))
+        return [prefix + column for column in dict.fromkeys(columns)]
+
+    @classmethod
+    def restrict_queryset(cls, query, fields, expand):
+        """Fetch only columns needed to render given fields."""
+        return query.only(*cls.columns(fields, expand))
 
+    @classmethod
+    def values_queryset(cls, query, fields, expand, ordering=()):
+        """Turn queryset into .values() rows holding columns needed to render given fields."""
+        columns = cls.columns(fields, expand)
+        columns.extend(name.lstrip('-') for name in ordering)
+        return query.values(*dict.fromkeys(columns), *query.query.annotations)
 
-class UserSerializer(serializers.Serializer):
+    @classmethod
+    def values_last_modified(cls, row: dict, prefix=''):
+        """Get time data of .values() row was last changed."""
+        return max(row[prefix + column] for column in cls.last_modified_columns)
+
+    @classmethod
+    def value_renderer(cls, name, fields, expand, prefix):
+        """Build function rendering single field from .values() row."""
+        # annotations have no column dependencies and are fetched under their own name
+        columns = [prefix + column for column in cls.column_dependencies.get(name, (name,)) or (name,)]
+        if name in cls.value_converters:
+            convert = cls.value_converters[name]
+            return lambda row: convert(*(row[column] for column in columns))
+
+        column, field = columns[0], cls._declared_fields[name]
+        if isinstance(field, PLAIN_FIELDS):
+            return itemgetter(column)
+        to_representation = field.to_representation
+        return lambda row: None if row[column] is None else to_representation(row[column])
+
+    @classmethod
+    @lru_cache(maxsize=256)
+    def value_plan(cls, fields=None, expand=(), prefix=''):
+        """Compile list of (field, renderer) pairs for given fields."""
+        names = [name for name in cls.readable_fields() if fields is None or name in fields]
+        return [(name, cls.value_renderer(name, fields, expand, prefix)) for name in names]
+
+    @classmethod
+    def render_values(cls, rows, fields=None, expand=()):
+        """Render .values() rows same way serializer renders model instances."""
+        # client controls order and duplicates of requested names, keep single plan per distinct selection
+        if fields is not None:
+            fields = tuple(name for name in cls.readable_fields() if name in fields)
+        expand = tuple(name for name in cls.expandable_fields if name in expand)
+        plan = cls.value_plan(fields, expand)
+        return [{name: render(row) for name, render in plan} for row in rows]
+
+
+class UserSerializer(SparseFieldsMixin, serializers.Serializer):
     """DRF serializer for user model."""
+    column_dependencies = {'avatar_url': ('email',)}
+    value_converters = {'avatar_url': gravatar_url}
+    always_columns = ('id', 'updated_at', 'last_seen')
+    last_modified_columns = ('updated_at', 'last_seen')
+
     id = serializers.IntegerField(read_only=True)
     username = serializers.CharField(max_length=150, validators=[validators.UniqueValidator(CustomUser.objects.all())])
     email = serializers.EmailField(required=True, write_only=True, validators=[validators.UniqueValidator(CustomUser.objects.all())])
@@ -11,6 +107,9 @@ class UserSerializer(serializers.Serializer):
     last_seen = serializers.DateTimeField(read_only=True)
     member_since = serializers.DateTimeField(read_only=True)
     avatar_url = serializers.ReadOnlyField()
+    post_count = serializers.IntegerField(read_only=True)
+    follower_count = serializers.IntegerField(read_only=True)
+    following_count = serializers.IntegerField(read_only=True)
     password = serializers.CharField(max_length=128, required=True, write_only=True)
 
     def create(self, validated_data):
@@ -23,20 +122,33 @@ class UserSerializer(serializers.Serializer):
 
     def update(self, instance: CustomUser, validated_data: dict):
         """This method will be called during user update in serializer.save()."""
+        changed = ['updated_at']
         for attr, value in validated_data.items():
             if hasattr(instance, attr):
                 if attr == 'password':
                     instance.set_password(value)
                 else:
                     setattr(instance, attr, value)
-        instance.save()
+                changed.append(attr)
+        # write only changed columns, instance may be built from cached snapshot
+        instance.save(update_fields=changed)
         return instance
 
 
 class PaginationQuerySerializer(serializers.Serializer):
-    limit = serializers.IntegerField(default=10)
-    offset = serializers.IntegerField(default=0)
+    limit = serializers.IntegerField(default=10, min_value=1)
+    offset = serializers.IntegerField(default=0, min_value=0)
+    cursor = serializers.CharField(required=False, allow_blank=True)
+    fields = serializers.CharField(required=False, help_text='Comma separated fields to render.')
+    expand = serializers.CharField(required=False, help_text='Comma separated related objects to render.')
+
+
+class PaginationSerializer(serializers.Serializer):
+    limit = serializers.IntegerField()
+    offset = serializers.IntegerField(required=False)
+    next = serializers.CharField(required=False, allow_null=True)
+    prev = serializers.CharField(required=False, allow_null=True)
 
 
-class UserPaginationSerializer(PaginationQuerySerializer):
+class UserPaginationSerializer(PaginationSerializer):
     data = UserSerializer(many=True)
@@ -1,9 +1,30 @@
+import json
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from io import StringIO
+from threading import Event
+
+import msgpack
+from asgiref.sync import async_to_sync
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
-from rest_framework.test import APITestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.utils.cache import has_vary_header
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, APITestCase
 
+from django_project.testing import QueryBudgetMixin
+from posts.models import Post
 from tokens.models import Token
+from . import activity
+from .activity import FLUSH_BATCH_SIZE, flush_last_seen, record_last_seen, take_pending
+from .conditional import not_modified, version_validators, with_validators
+from .renderers import ORJSONRenderer
 from .serializers import UserSerializer
+from .views import AsyncUserDetail, AsyncUserList, AsyncUserPostList, UserDetail, UserList, UserPostList
 
 User = get_user_model()
 
@@ -38,6 +59,113 @@ class UserModelTests(TestCase):
         self.assertTrue(self.super_user.is_superuser)
 
 
+class UserCountersTests(TestCase):
+    def setUp(self):
+        self.u1 = User.objects.create_user(
+            username='bob',
+            email='bob@example.com',
+            password='dog'
+        )
+
+        self.u2 = User.objects.create_user(
+            username='alice',
+            email='alice@example.com',
+            password='cat'
+        )
+
+    def test_follow_counters(self):
+        self.u1.follow(self.u2)
+        self.u1.follow(self.u2)
+
+        self.u1.refresh_from_db()
+        self.u2.refresh_from_db()
+        self.assertEqual(self.u1.following_count, 1)
+        self.assertEqual(self.u2.follower_count, 1)
+
+        self.u1.unfollow(self.u2)
+        self.u1.unfollow(self.u2)
+
+        self.u1.refresh_from_db()
+        self.assertEqual(self.u1.following_count, 0)
+
+    def test_save_keeps_counters(self):
+        stale = User.objects.get(pk=self.u2.pk)
+        self.u1.follow(self.u2)
+
+        stale.about_me = 'Changed'
+        stale.save()
+
+        self.u2.refresh_from_db()
+        self.assertEqual(self.u2.follower_count, 1)
+        self.assertEqual(self.u2.about_me, 'Changed')
+
+    def test_recount_users(self):
+        self.u1.follow(self.u2)
+        Post.objects.create(title='Title', content='Content', author=self.u1)
+        User.objects.update(post_count=7, follower_count=3)
+
+        out = StringIO()
+        call_command('recount_users', '--batch-size', '1', stdout=out)
+
+        self.u1.refresh_from_db()
+        self.u2.refresh_from_db()
+        self.assertEqual((self.u1.post_count, self.u1.follower_count, self.u1.following_count), (1, 0, 1))
+        self.assertEqual((self.u2.post_count, self.u2.follower_count, self.u2.following_count), (0, 1, 0))
+        self.assertIn('repaired 2', out.getvalue())
+
+
+@override_settings(LAST_SEEN_RESOLUTION=60, LAST_SEEN_FLUSH_INTERVAL=3600)
+class UserLastSeenTests(TestCase):
+    def setUp(self):
+        take_pending()
+        self.user = User.objects.create_user(username='bob', email='bob@example.com', password='dog')
+        self.seen = self.user.last_seen
+
+    def test_ping_within_resolution(self):
+        self.user.ping()
+        self.assertEqual(take_pending(), {})
+
+    def test_ping_is_buffered(self):
+        users = [User.objects.get(pk=self.user.pk), User.objects.get(pk=self.user.pk)]
+        for user in users:
+            user.last_seen -= timedelta(minutes=5)
+
+        with self.assertNumQueries(0):
+            for user in users:
+                user.ping()
+        self.assertEqual(User.objects.get(pk=self.user.pk).last_seen, self.seen)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(flush_last_seen(), 1)
+        self.assertEqual(User.objects.get(pk=self.user.pk).last_seen, users[0].last_seen)
+
+    def test_flush_keeps_newer_value(self):
+        record_last_seen(self.user.pk, self.seen - timedelta(minutes=5))
+        flush_last_seen()
+
+        self.assertEqual(User.objects.get(pk=self.user.pk).last_seen, self.seen)
+
+    def test_first_record_starts_background_flusher(self):
+        activity.flusher = None
+        self.addCleanup(take_pending)
+
+        record_last_seen(self.user.pk, self.seen - timedelta(minutes=5))
+        self.assertIsNot(activity.flusher, None)
+        self.assertTrue(activity.flusher.is_alive())
+
+    def test_full_batch_wakes_background_flusher(self):
+        # stand-ins keep flusher started by other tests out of the way
+        self.addCleanup(setattr, activity, 'flusher', activity.flusher)
+        self.addCleanup(setattr, activity, 'flush_requested', activity.flush_requested)
+        activity.flusher, activity.flush_requested = object(), Event()
+        self.addCleanup(take_pending)
+
+        with self.assertNumQueries(0):
+            for pk in range(FLUSH_BATCH_SIZE):
+                record_last_seen(pk, self.seen)
+        self.assertTrue(activity.flush_requested.is_set())
+
+
 class UserSerializerTests(TestCase):
     def test_valid_data(self):
         data = {
@@ -57,9 +185,112 @@ class UserSerializerTests(TestCase):
         serializer = UserSerializer(data=data)
         self.assertFalse(serializer.is_valid())
 
+    def test_values_rendering_matches_serializer(self):
+        User.objects.create_user(username='bob', email='bob@example.com', password='dog')
+
+        for fields in [None, ['username', 'avatar_url', 'last_seen']]:
+            rows = UserSerializer.values_queryset(User.objects.all(), fields, ())
+            self.assertEqual(
+                ORJSONRenderer().render(UserSerializer.render_values(rows, fields)),
+                JSONRenderer().render(UserSerializer(User.objects.all(), many=True, fields=fields).data)
+            )
+
+    def test_values_plans_shared_by_equivalent_field_lists(self):
+        UserSerializer.value_plan.cache_clear()
+
+        for fields in [['id', 'username'], ['username', 'id'], ['id', 'id', 'username', 'id']]:
+            UserSerializer.render_values([], fields)
+
+        self.assertEqual(UserSerializer.value_plan.cache_info().currsize, 1)
+
+
+class ORJSONRendererTests(TestCase):
+    def test_output_matches_json_renderer(self):
+        data = {
+            'id': 1,
+            'title': 'Ünïcode',
+            'created_at': datetime(2022, 12, 1, 10, 30, 5, 123, tzinfo=timezone.utc),
+            'price': Decimal('1.5'),
+            'tags': ['a', 'b']
+        }
+
+        self.assertEqual(json.loads(ORJSONRenderer().render(data)), json.loads(JSONRenderer().render(data)))
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+    def test_indented_output(self):
+        rendered = ORJSONRenderer().render({'id': 1}, 'application/json; indent=4')
+        self.assertEqual(rendered, b'{\n    "id": 1\n}')
+
+
+class MessagePackTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='bob',
+            email='bob@example.com',
+            password='dog'
+        )
+        self.other = User.objects.create_user(
+            username='alice',
+            email='alice@example.com',
+            password='cat'
+        )
+        self.user.follow(self.other)
+        Post.objects.create(title='Title', content='Content', author=self.user)
+
+    def provide_token(self):
+        token = Token(user=self.user)
+        token.generate()
+        token.save()
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token.access_token}')
+
+    def test_responses_match_json(self):
+        for url in ['/posts/', '/users/bob/', f'/users/{self.user.id}/following/', '/me/following/']:
+            if url.startswith('/me/'):
+                self.provide_token()
+            json_resp = self.client.get(url, HTTP_ACCEPT='application/json')
+            msgpack_resp = self.client.get(url, HTTP_ACCEPT='application/msgpack')
+
+            self.assertEqual(msgpack_resp.status_code, 200)
+            self.assertEqual(msgpack_resp['Content-Type'], 'application/msgpack')
+            self.assertNotEqual(msgpack_resp['ETag'], json_resp['ETag'])
+            self.assertTrue(has_vary_header(json_resp, 'Accept'))
+            self.assertTrue(has_vary_header(msgpack_resp, 'Accept'))
+            # cached JSON copy is never revalidated for msgpack client
+            resp = self.client.get(url, HTTP_ACCEPT='application/msgpack', HTTP_IF_NONE_MATCH=json_resp['ETag'])
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual(msgpack.unpackb(msgpack_resp.content), json.loads(json_resp.content))
+
+    def test_request_body(self):
+        self.provide_token()
+        body = msgpack.packb({'title': 'Packed', 'content': 'Packed content'})
+        resp = self.client.post('/posts/', body, content_type='application/msgpack', HTTP_ACCEPT='application/msgpack')
+
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(msgpack.unpackb(resp.content)['title'], 'Packed')
+
+        resp = self.client.post('/posts/', b'\xc1', content_type='application/msgpack')
+        self.assertEqual(resp.status_code, 400)
+
+
+class ConditionalResponseTests(TestCase):
+    def test_validated_responses_vary_on_accept(self):
+        request = RequestFactory().get('/users/bob/', HTTP_ACCEPT='application/msgpack')
+        etag, last_modified = version_validators(request, [('CustomUser', 1, datetime.now(timezone.utc))])
+
+        resp = with_validators(HttpResponse(), etag, last_modified)
+        self.assertTrue(has_vary_header(resp, 'Accept'))
+
+        request.META['HTTP_IF_NONE_MATCH'] = etag
+        resp = not_modified(request, etag, last_modified)
+        self.assertEqual(resp.status_code, 304)
+        self.assertTrue(has_vary_header(resp, 'Accept'))
+
 
 class UserAPITests(APITestCase):
     def setUp(self):
+        cache.clear()
         self.user = User.objects.create_user(
             username='bob',
             email='bob@example.com',
@@ -81,6 +312,32 @@ class UserAPITests(APITestCase):
         self.assertTrue('offset' in resp.data)
         self.assertEqual(len(resp.data['data']), 1)
 
+    def test_retrieve_users_with_cursor(self):
+        User.objects.create_user(username='alice', email='alice@example.com', password='cat')
+
+        resp = self.client.get('/users/?limit=1&cursor=')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['data'][0]['username'], 'bob')
+
+        resp = self.client.get(f'/users/?limit=1&cursor={resp.data["next"]}')
+        self.assertEqual(resp.data['data'][0]['username'], 'alice')
+        self.assertIsNone(resp.data['next'])
+
+    def test_limit_is_capped(self):
+        resp = self.client.get('/users/?limit=100000')
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['limit'], settings.PAGINATION_MAX_LIMIT)
+
+    def test_retrieve_users_selected_fields(self):
+        resp = self.client.get('/users/?fields=username,avatar_url')
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(set(resp.data['data'][0]), {'username', 'avatar_url'})
+
+        resp = self.client.get('/users/bob/?fields=username')
+        self.assertEqual(resp.data, {'username': 'bob'})
+
     def test_create_new_user(self):
         data = {
             'username': 'alice',
@@ -106,6 +363,31 @@ class UserAPITests(APITestCase):
         self.assertTrue('email' not in resp.data)
         self.assertTrue('password' not in resp.data)
 
+    def test_retrieve_user_by_username_etag(self):
+        resp = self.client.get('/users/bob/')
+        etag = resp['ETag']
+        self.assertTrue(has_vary_header(resp, 'Accept'))
+
+        resp = self.client.get('/users/bob/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+        self.assertTrue(has_vary_header(resp, 'Accept'))
+
+        self.provide_token()
+        self.client.put('/users/me/', {'about_me': 'Changed'})
+
+        resp = self.client.get('/users/bob/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['about_me'], 'Changed')
+
+    def test_renamed_user_is_not_served_from_cache(self):
+        self.client.get('/users/bob/')
+
+        self.provide_token()
+        self.client.put('/users/me/', {'username': 'alice'})
+
+        self.assertEqual(self.client.get('/users/bob/').status_code, 404)
+        self.assertEqual(self.client.get('/users/alice/').status_code, 200)
+
     def test_retrieve_authenticated_user(self):
         self.provide_token()
 
@@ -129,3 +411,47 @@ class UserAPITests(APITestCase):
         self.assertEqual(resp.data['username'], 'alice')
         self.user.refresh_from_db()
         self.assertEqual(self.user.email, 'alice@example.com')
+
+
+class UserAsyncViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(
+            username='bob',
+            email='bob@example.com',
+            password='dog'
+        )
+
+    def test_reads_match_sync_views(self):
+        for view, async_view, url, kwargs in [
+            (UserList, AsyncUserList, '/users/', {}),
+            (UserDetail, AsyncUserDetail, '/users/bob/?fields=username,post_count', {'username': 'bob'}),
+            (UserPostList, AsyncUserPostList, '/users/bob/posts/', {'username': 'bob'}),
+        ]:
+            resp = view.as_view()(self.factory.get(url), **kwargs)
+            async_resp = async_to_sync(async_view.as_view())(self.factory.get(url), **kwargs)
+
+            self.assertEqual(async_resp.status_code, 200)
+            self.assertEqual(async_resp.data, resp.data)
+
+        resp = async_to_sync(AsyncUserPostList.as_view())(self.factory.get('/users/alice/posts/'), username='alice')
+        self.assertEqual(resp.status_code, 404)
+
+
+class UserQueryBudgetTests(QueryBudgetMixin, APITestCase):
+    """Read endpoints must not issue queries per rendered user."""
+    budgets = {
+        '/users/': 1,
+        '/users/?cursor=': 1,
+        '/users/user0/': 1,
+        '/users/me/': 2,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.bulk_create(
+            User(username=f'user{i}', email=f'user{i}@example.com')
+            for i in range(15)
+        )
+        cls.budget_user = User.objects.get(username='user0')
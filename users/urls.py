@@ -1,9 +1,11 @@
 from django.urls import path 
+
+from .async_views import variant
 from . import views
 
 urlpatterns = [
     path('me/', views.CurrentUserDetail.as_view(), name='current-user-detail'),
-    path('<username>/', views.UserDetail.as_view(), name='user-detail'),
-    path('<username>/posts/', views.UserPostList.as_view(), name='user-post-list'),
-    path('', views.UserList.as_view(), name='user-list'),
+    path('<username>/', variant(views.UserDetail, views.AsyncUserDetail).as_view(), name='user-detail'),
+    path('<username>/posts/', variant(views.UserPostList, views.AsyncUserPostList).as_view(), name='user-post-list'),
+    path('', variant(views.UserList, views.AsyncUserList).as_view(), name='user-list'),
 ]
\ No newline at end of file
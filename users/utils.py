@@ -1,37 +1,139 @@
 from functools import wraps
+from inspect import iscoroutinefunction
+from typing import Optional
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Now
 from django.http import Http404
 from rest_framework import status
+from rest_framework.exceptions import ParseError, ValidationError
 from rest_framework.request import Request
 from rest_framework.response import Response
 
+from django_project.routers import primary_reads
 from posts.serializers import PostSerializer
 from posts.models import Post
-from .serializers import UserSerializer
+from tokens.cache import evict_users
+from .cache import aget_user_entry_by_username, aset_user_entry, get_user_entry, get_user_entry_by_username, \
+    invalidate_users, set_user_entry
+from .conditional import not_modified, validators, version_validators, with_validators
+from .models import Follow
+from .pagination import InvalidCursor, cursor_page, cursor_page_query
+from .serializers import UserSerializer, PaginationQuerySerializer, SparseFieldsMixin
 
 User = get_user_model()
 
 
-def paginated_response(serializer_class):
-    """If you decorate function with this, it will ensure paginated response."""
-    def wrapper(f):
-        @wraps(f)
-        def paginate(request: Request, *args, **kwargs):
-            limit = int(request.query_params.get('limit', 10))
-            offset = int(request.query_params.get('offset', 0))
+def get_sparse_params(request: Request, serializer_class):
+    """Parse fields and expand query parameters, None fields means all fields."""
+    def split(param):
+        return [name.strip() for name in request.query_params.get(param, '').split(',') if name.strip()]
+
+    fields = split('fields') or None
+    expand = split('expand')
+
+    unknown_fields = set(fields or ()) - set(serializer_class.readable_fields())
+    if unknown_fields:
+        raise ValidationError({'fields': f'Unknown fields: {", ".join(sorted(unknown_fields))}.'})
+    unknown_expand = set(expand) - set(serializer_class.expandable_fields)
+    if unknown_expand:
+        raise ValidationError({'expand': f'Unknown fields: {", ".join(sorted(unknown_expand))}.'})
+
+    return fields, expand
+
+
+def page_params(request: Request, serializer_class) -> dict:
+    """Validate pagination and sparse fields query parameters."""
+    params = PaginationQuerySerializer(data=request.query_params)
+    params.is_valid(raise_exception=True)
+    fields, expand = get_sparse_params(request, serializer_class)
+    return {
+        **params.validated_data,
+        'limit': min(params.validated_data['limit'], settings.PAGINATION_MAX_LIMIT),
+        'keyset': 'cursor' in request.query_params,
+        'fields': fields,
+        'expand': expand
+    }
+
+
+def paginated_response(serializer_class, ordering=('id',)):
+    """If you decorate function with this, it will ensure paginated response.
+
+    Offset pagination is used by default, passing ``cursor`` query parameter
+    (empty for the first page) switches to keyset pagination over ``ordering``.
+    ``fields`` and ``expand`` query parameters select rendered fields and
+    restrict fetched columns accordingly. Sparse fields serializers render
+    plain .values() rows without building model instances. Decorated coroutine
+    functions fetch rows with async ORM.
+    """
+    fast = issubclass(serializer_class, SparseFieldsMixin)
+
+    def page_query(request: Request, params: dict, query):
+        """Build query fetching requested page and function building response from its rows."""
+        limit, fields, expand = params['limit'], params['fields'], params['expand']
+        if fast:
+            query = serializer_class.values_queryset(query, fields, expand, ordering)
+        elif fields is not None:
+            query = serializer_class.restrict_queryset(query, fields, expand)
+
+        if params['keyset']:
+            try:
+                rows_query, direction, values = cursor_page_query(query, ordering, limit, params.get('cursor'))
+            except InvalidCursor:
+                raise ParseError('Invalid cursor.')
 
-            query = f(request, *args, **kwargs)
-            pagination_query = query[offset:limit]
-            serializer = serializer_class(pagination_query, many=True)
+            def locate(rows):
+                page = cursor_page(rows, ordering, limit, direction, values)
+                return page['rows'], {'next': page['next'], 'prev': page['prev']}
+        else:
+            offset = params['offset']
+            rows_query = query.order_by(*ordering)[offset:offset + limit]
+
+            def locate(rows):
+                return rows, {'offset': offset}
+
+        def respond(rows: list):
+            rows, position = locate(rows)
+            if fast:
+                etag, last_modified = version_validators(request, [
+                    (query.model.__name__, row['id'], serializer_class.values_last_modified(row)) for row in rows
+                ])
+            else:
+                etag, last_modified = validators(request, rows)
+            response = not_modified(request, etag, last_modified)
+            if response is not None:
+                return response
+
+            if fast:
+                items = serializer_class.render_values(rows, fields, expand)
+            else:
+                items = serializer_class(rows, many=True, fields=fields, expand=expand).data
 
             data = {
                 'limit': limit,
-                'offset': offset,
-                'data': serializer.data
+                **position,
+                'data': items
             }
 
-            return Response(data)
+            return with_validators(Response(data), etag, last_modified)
+        return rows_query, respond
+
+    def wrapper(f):
+        if iscoroutinefunction(f):
+            @wraps(f)
+            async def apaginate(request: Request, *args, **kwargs):
+                params = page_params(request, serializer_class)
+                rows_query, respond = page_query(request, params, await f(request, *args, **kwargs))
+                return respond([row async for row in rows_query])
+            return apaginate
+
+        @wraps(f)
+        def paginate(request: Request, *args, **kwargs):
+            params = page_params(request, serializer_class)
+            rows_query, respond = page_query(request, params, f(request, *args, **kwargs))
+            return respond(list(rows_query))
         return paginate
     return wrapper
 
@@ -42,6 +144,12 @@ def get_all_users(request: Request):
     return User.objects.all()
 
 
+@paginated_response(UserSerializer)
+async def aget_all_users(request: Request):
+    """Retrieve all users using async ORM."""
+    return User.objects.all()
+
+
 def create_user(request: Request):
     """Create new user."""
     serializer = UserSerializer(data=request.data)
@@ -59,24 +167,119 @@ def get_user_object(username: str):
         raise Http404
 
 
+async def aget_user_object(username: str):
+    """Retrieve user by username using async ORM."""
+    try:
+        return await User.objects.aget(username=username)
+    except User.DoesNotExist:
+        raise Http404
+
+
+def get_cached_user(username: str) -> dict:
+    """Retrieve serialized user through payload cache."""
+    entry = get_user_entry_by_username(username)
+    if entry is None:
+        with primary_reads():
+            user = get_user_object(username)
+        entry = set_user_entry(user, UserSerializer(user).data)
+    return entry
+
+
+async def aget_cached_user(username: str) -> dict:
+    """Retrieve serialized user through payload cache using async ORM and cache API."""
+    entry = await aget_user_entry_by_username(username)
+    if entry is None:
+        with primary_reads():
+            user = await aget_user_object(username)
+        entry = await aset_user_entry(user, UserSerializer(user).data)
+    return entry
+
+
+def cached_user_response(request: Request, entry: dict, fields: Optional[list]):
+    """Send cached user representation unless client copy is fresh."""
+    etag, last_modified = version_validators(request, [('CustomUser', entry['data']['id'], entry['last_modified'])])
+    response = not_modified(request, etag, last_modified)
+    if response is not None:
+        return response
+
+    data = entry['data'] if fields is None else {name: entry['data'][name] for name in fields}
+    return with_validators(Response(data), etag, last_modified)
+
+
 def get_user_by_username(request: Request, username: str):
     """Retrieve user by username and send response."""
-    user = get_user_object(username)
-    serializer = UserSerializer(user)
-    return Response(serializer.data)
+    fields, _ = get_sparse_params(request, UserSerializer)
+    return cached_user_response(request, get_cached_user(username), fields)
+
+
+async def aget_user_by_username(request: Request, username: str):
+    """Retrieve user by username and send response using async ORM."""
+    fields, _ = get_sparse_params(request, UserSerializer)
+    return cached_user_response(request, await aget_cached_user(username), fields)
+
+
+def get_current_user(request: Request):
+    """Retrieve authenticated user by id and send response, username of cached snapshot may be outdated."""
+    fields, _ = get_sparse_params(request, UserSerializer)
+    entry = get_user_entry(request.user.pk)
+    if entry is None:
+        with primary_reads():
+            user = User.objects.get(pk=request.user.pk)
+        entry = set_user_entry(user, UserSerializer(user).data)
+    return cached_user_response(request, entry, fields)
 
 
 def update_user(request: Request):
     """Update user informstion."""
-    serializer = UserSerializer(request.user, data=request.data, partial=True)
+    # authenticated user may be cached snapshot, respond with current counters and last seen
+    with primary_reads():
+        user = User.objects.get(pk=request.user.pk)
+    serializer = UserSerializer(user, data=request.data, partial=True)
     if serializer.is_valid():
         serializer.save()
+        invalidate_users(user.pk)
+        evict_users(user.pk)
         return Response(serializer.data)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-@paginated_response(PostSerializer)
+def counter_expressions() -> dict:
+    """Expressions computing actual values of user counters."""
+    def count_related(model, field):
+        rows = model.objects.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(n=Count('pk'))
+        return Coalesce(Subquery(rows.values('n')), 0)
+
+    return {
+        'post_count': count_related(Post, 'author'),
+        'follower_count': count_related(Follow, 'followed'),
+        'following_count': count_related(Follow, 'follower'),
+    }
+
+
+def recount_users(pks: list) -> int:
+    """Repair drifted counters of given users, return number of repaired users."""
+    expressions = counter_expressions()
+    drifted = list(
+        User.objects.filter(pk__in=pks)
+        .annotate(**{f'actual_{name}': expression for name, expression in expressions.items()})
+        .exclude(**{name: F(f'actual_{name}') for name in expressions})
+        .values_list('pk', flat=True)
+    )
+    if drifted:
+        User.objects.filter(pk__in=drifted).update(updated_at=Now(), **expressions)
+        invalidate_users(*drifted)
+    return len(drifted)
+
+
+@paginated_response(PostSerializer, ordering=('-created_at', '-id'))
 def get_all_user_posts(request: Request, username: str):
     """Retrieve all user posts."""
     user = get_user_object(username)
-    return Post.objects.filter(author=user)
+    return Post.objects.filter(author=user).select_related('author')
+
+
+@paginated_response(PostSerializer, ordering=('-created_at', '-id'))
+async def aget_all_user_posts(request: Request, username: str):
+    """Retrieve all user posts using async ORM."""
+    user = await aget_user_object(username)
+    return Post.objects.filter(author=user).select_related('author')
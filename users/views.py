@@ -5,7 +5,9 @@ from rest_framework.permissions import IsAuthenticated
 
 from tokens.authentication import CustomTokenAuthentication, CustomTokenAuthenticationScheme
 from posts.serializers import PostPaginationSerializer
-from .utils import create_user, get_all_users, get_all_user_posts, get_user_by_username, update_user
+from .async_views import AsyncAPIView
+from .utils import create_user, get_current_user, get_all_users, get_all_user_posts, get_user_by_username, \
+    update_user, aget_all_users, aget_all_user_posts, aget_user_by_username
 from .serializers import UserSerializer, UserPaginationSerializer, PaginationQuerySerializer
 
 
@@ -27,6 +29,16 @@ class UserList(APIView):
         return create_user(request)
 
 
+class AsyncUserList(AsyncAPIView, UserList):
+    @extend_schema(
+        summary='Retrieve all users', tags=['Users'],
+        responses=UserPaginationSerializer, auth=[],
+        parameters=[PaginationQuerySerializer])
+    async def get(self, request: Request):
+        """Retrieve all users."""
+        return await aget_all_users(request)
+
+
 class UserDetail(APIView):
     @extend_schema(
         summary='Retrieve user by username', tags=['Users'],
@@ -36,6 +48,15 @@ class UserDetail(APIView):
         return get_user_by_username(request, username) 
 
 
+class AsyncUserDetail(AsyncAPIView):
+    @extend_schema(
+        summary='Retrieve user by username', tags=['Users'],
+        responses=UserSerializer, auth=[])
+    async def get(self, request: Request, username: str):
+        """Retrieve user by username."""
+        return await aget_user_by_username(request, username)
+
+
 class CurrentUserDetail(APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [CustomTokenAuthentication]
@@ -45,8 +66,7 @@ class CurrentUserDetail(APIView):
         responses=UserSerializer, parameters=[CustomTokenAuthenticationScheme])
     def get(self, request: Request):
         """Retrieve authenticated user."""
-        username = request.user.username
-        return get_user_by_username(request, username) 
+        return get_current_user(request)
 
     @extend_schema(
         summary='Update authenticated user', tags=['Users'],
@@ -63,4 +83,13 @@ class UserPostList(APIView):
         parameters=[PaginationQuerySerializer], tags=['Users'], auth=[])
     def get(self, request: Request, username: str):
         """Retrieve all user posts."""
-        return get_all_user_posts(request, username) 
+        return get_all_user_posts(request, username)
+
+
+class AsyncUserPostList(AsyncAPIView):
+    @extend_schema(
+        summary='Retrieve all user posts', responses=PostPaginationSerializer,
+        parameters=[PaginationQuerySerializer], tags=['Users'], auth=[])
+    async def get(self, request: Request, username: str):
+        """Retrieve all user posts."""
+        return await aget_all_user_posts(request, username)